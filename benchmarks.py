@@ -0,0 +1,1204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 性能基准测试
+用法: python benchmarks.py [基准名称 ...] [--json 结果文件] [--baseline 基线文件] [--threshold 0.1]
+不带名称时运行全部基准；Qt相关的基准默认使用offscreen平台，无需显示器
+"""
+
+import os
+import re
+import math
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import random
+import string
+import tracemalloc
+from contextlib import contextmanager
+
+from category_matcher import CATEGORY_KEYWORDS, DEFAULT_CATEGORY, CategoryMatcher
+from scheduling import AdaptiveInterval, MessageScheduler
+from corpus import (MANIFEST_FILE, PackedCorpus, LazyCorpus, MmapCorpus, StreamingCorpus,
+                    write_compiled_corpus)
+
+# 已注册的基准测试
+BENCHMARKS = {}
+
+# QApplication实例需要保持引用，否则会被回收
+_QT_APP = None
+
+
+def benchmark(name):
+    """注册基准测试的装饰器"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def qt_app():
+    """获取QApplication实例（默认使用offscreen平台，无需显示器）"""
+    global _QT_APP
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    if _QT_APP is None:
+        _QT_APP = QApplication.instance() or QApplication(sys.argv[:1])
+    return _QT_APP
+
+
+@contextmanager
+def floating_text_app(**options):
+    """创建完整的FloatingTextApp，设置和抽样状态写在临时目录中（不影响用户的文件），结束时关闭
+
+    options原样传给FloatingTextApp，例如window_backend
+    """
+    qt_app()
+    import main_enhanced_with_super_library_bugfixed as app_main
+
+    with tempfile.TemporaryDirectory() as directory:
+        floating_app = app_main.FloatingTextApp(data_dir=directory, **options)
+        try:
+            yield floating_app
+        finally:
+            floating_app.close()
+
+
+def measure(func, repeat=5):
+    """多次运行取最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# 模拟的窗口标题样本
+SAMPLE_TITLES = [
+    "main.py - MyProject - Visual Studio Code",
+    "新标签页 - Google Chrome",
+    "【4K】年度最佳电影混剪_哔哩哔哩_bilibili",
+    "季度报告.docx - Word",
+    "Steam",
+    "任务管理器",
+    "微信",
+    "网易云音乐",
+    "三体 - Kindle for PC",
+    "未知窗口",
+    "桌面",
+    "Untitled - Paint",
+]
+
+
+def _any_chain_category(keyword_table, window_title):
+    """原先基于any()链的类别判断，用作对照组"""
+    window_title = window_title.lower()
+    for category, keywords in keyword_table:
+        if any(keyword in window_title for keyword in keywords):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def _scaled_keyword_table(factor, rng):
+    """按倍数扩充关键词表，扩充部分为随机生成的关键词"""
+    table = []
+    for category, keywords in CATEGORY_KEYWORDS:
+        extra = []
+        for _ in range(len(keywords) * (factor - 1)):
+            length = rng.randint(5, 10)
+            extra.append("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+        table.append((category, keywords + extra))
+    return table
+
+
+def _random_titles(count, rng):
+    """生成混合真实样本和随机文本的窗口标题"""
+    titles = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            titles.append(rng.choice(SAMPLE_TITLES))
+        else:
+            length = rng.randint(10, 60)
+            titles.append("".join(rng.choice(string.ascii_letters + " -_.") for _ in range(length)))
+    return titles
+
+
+@benchmark("category_matcher")
+def bench_category_matcher():
+    """对比any()链与编译后的多模式匹配器（1x/10x/100x关键词量）"""
+    rng = random.Random(42)
+    titles = _random_titles(2000, rng)
+    results = {}
+
+    print(f"{'关键词倍数':<10}{'关键词数':>10}{'any()链(us/次)':>18}{'匹配器(us/次)':>18}{'加速比':>10}")
+    for factor in (1, 10, 100):
+        table = _scaled_keyword_table(factor, rng)
+        matcher = CategoryMatcher(table)
+
+        # 两种实现的结果必须一致
+        for title in titles:
+            assert matcher.match(title) == _any_chain_category(table, title), title
+
+        chain_time = measure(lambda: [_any_chain_category(table, t) for t in titles], repeat=3)
+        matcher_time = measure(lambda: matcher.match_many(titles), repeat=3)
+        chain_us = chain_time / len(titles) * 1e6
+        matcher_us = matcher_time / len(titles) * 1e6
+        print(f"{factor:<14}{matcher.keyword_count:>10}{chain_us:>18.2f}{matcher_us:>18.2f}"
+              f"{chain_us / matcher_us:>10.1f}x")
+        results[f"x{factor}"] = {"any_chain_us": chain_us, "matcher_us": matcher_us}
+
+    return results
+
+
+@benchmark("adaptive_polling")
+def bench_adaptive_polling():
+    """模拟一小时会话，对比固定2秒轮询与自适应退避的每分钟唤醒次数"""
+    session = 3600.0
+    results = {}
+
+    # 场景: (名称, 窗口切换间隔秒数；None表示完全空闲)
+    scenarios = [("空闲/锁屏", None), ("每10分钟切换", 600.0), ("每分钟切换", 60.0)]
+    print(f"{'场景':<14}{'固定轮询(次/分)':>16}{'自适应(次/分)':>16}")
+    for name, switch_every in scenarios:
+        backoff = AdaptiveInterval(2.0, max_scale=16)
+        now = 0.0
+        wakeups = 0
+        next_switch = switch_every
+        while now < session:
+            now += backoff.current
+            wakeups += 1
+            if next_switch is not None and now >= next_switch:
+                backoff.activity()
+                next_switch += switch_every
+            else:
+                backoff.idle()
+        fixed = session / 2.0 / 60
+        adaptive = wakeups / (session / 60)
+        print(f"{name:<14}{fixed:>16.1f}{adaptive:>16.1f}")
+        results[name] = {"fixed_per_minute": fixed, "adaptive_per_minute": adaptive}
+
+    return results
+
+
+@benchmark("fake_backend")
+def bench_fake_backend():
+    """用FakeBackend回放一段窗口切换脚本，检查只有标题真正变化时才重新判断类别，且全程没有轮询"""
+    app = qt_app()
+    from PyQt5.QtCore import QTimer, QEventLoop
+    from window_tracker import FakeBackend, PollingBackend
+
+    # (延迟毫秒, 标题)；重复的标题不算变化
+    script = [(10, "main.py - Visual Studio Code"), (20, "main.py - Visual Studio Code"),
+              (30, "YouTube - Google Chrome"), (40, "YouTube - Google Chrome"),
+              (50, "main.py - Visual Studio Code"), (60, "微信"), (70, "微信")]
+    changes = 0
+    previous = "桌面"
+    for _, title in script:
+        changes += title != previous
+        previous = title
+
+    backend = FakeBackend("桌面")
+    with floating_text_app(window_backend=backend) as floating_app:
+        # 先让首帧之后的启动工作（包括一次活动检测）跑完
+        app.processEvents()
+        before = floating_app.get_activity_stats()
+        emitted = []
+        backend.titleChanged.connect(emitted.append)
+
+        loop = QEventLoop()
+        backend.play(script)
+        QTimer.singleShot(script[-1][0] + 50, loop.quit)
+        loop.exec_()
+        backend.stop()
+
+        after = floating_app.get_activity_stats()
+        classified = sum(after[key] - before[key] for key in ("unchanged", "hits", "misses"))
+        activity_timer = getattr(floating_app, "activity_timer", None)
+        pollers = floating_app.findChildren(PollingBackend)
+
+        print(f"脚本标题数: {len(script)}  真实变化: {changes}  发出信号: {len(emitted)}  "
+              f"判断类别: {classified}  当前类别: {floating_app.current_category}")
+        assert floating_app.window_backend is backend, "FloatingTextApp没有使用传入的后端"
+        assert len(emitted) == changes, f"后端发出{len(emitted)}次信号，应为{changes}次"
+        assert classified == changes, f"判断类别{classified}次，应为{changes}次"
+        assert after["unchanged"] == before["unchanged"], "重复标题不应进入类别判断"
+        assert activity_timer is None or not activity_timer.isActive(), "事件驱动后端下activity_timer不应运行"
+        assert not pollers, "事件驱动后端下不应创建轮询后端"
+
+    return {"titles": len(script), "changes": changes, "classified": classified}
+
+
+@benchmark("bubble_paint")
+def bench_bubble_paint():
+    """对比每种背景样式直接绘制与缓存贴图的单次绘制耗时"""
+    qt_app()
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QColor, QImage, QPainter
+    import main_enhanced_with_super_library_bugfixed as app_main
+
+    width, height, frames = 240, 90, 300
+    color = QColor(200, 200, 255, 220)
+    target = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    cache = app_main.BubbleBackgroundCache()
+    results = {}
+
+    def paint_direct(bg_style):
+        for _ in range(frames):
+            target.fill(Qt.transparent)
+            painter = QPainter(target)
+            app_main.paint_bubble_background(painter, width, height, bg_style, color)
+            painter.end()
+
+    def paint_cached(bg_style):
+        for _ in range(frames):
+            target.fill(Qt.transparent)
+            painter = QPainter(target)
+            painter.drawPixmap(0, 0, cache.get(bg_style, color, width, height))
+            painter.end()
+
+    print(f"{'样式':<6}{'直接绘制(us/帧)':>18}{'缓存贴图(us/帧)':>18}{'加速比':>10}")
+    for bg_style in range(4):
+        direct_us = measure(lambda: paint_direct(bg_style)) / frames * 1e6
+        cached_us = measure(lambda: paint_cached(bg_style)) / frames * 1e6
+        print(f"{bg_style:<8}{direct_us:>18.1f}{cached_us:>18.1f}{direct_us / cached_us:>10.1f}x")
+        results[f"style{bg_style}"] = {"direct_us": direct_us, "cached_us": cached_us}
+
+    stats = cache.get_stats()
+    print(f"缓存命中率: {stats['hit_rate']:.2%}（命中{stats['hits']}次，未命中{stats['misses']}次）")
+    results["cache"] = stats
+    return results
+
+
+def current_rss_kb():
+    """当前进程常驻内存（KB），不支持的平台返回峰值"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@benchmark("bubble_soak")
+def bench_bubble_soak(calls=20000, checkpoints=5, rss_tolerance_kb=8192):
+    """连续调用display_random_text，检查常驻内存和窗口数量保持平稳
+
+    显示中的气泡不超过上限，顶层窗口数不比第一个检查点多，常驻内存比第一个检查点增长不超过rss_tolerance_kb
+    """
+    app = qt_app()
+    from PyQt5.QtCore import QEvent
+    from PyQt5.QtWidgets import QApplication
+
+    results = {"checkpoints": []}
+    with floating_text_app() as floating_app:
+        floating_app.display_timer.stop()
+        floating_app.settings_manager.message_count = 5
+
+        print(f"{'调用次数':>10}{'RSS(KB)':>12}{'顶层窗口':>10}{'显示中':>8}{'已销毁':>10}{'已淘汰':>10}")
+        step = calls // checkpoints
+        for done in range(step, calls + 1, step):
+            for _ in range(step):
+                floating_app.display_random_text()
+            app.processEvents()
+            QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+            stats = floating_app.get_bubble_stats()
+            widgets = len(QApplication.topLevelWidgets())
+            rss = current_rss_kb()
+            print(f"{done:>10}{rss:>12}{widgets:>10}{stats['live']:>8}{stats['destroyed']:>10}{stats['evicted']:>10}")
+            results["checkpoints"].append({"calls": done, "rss_kb": rss, "top_level_widgets": widgets,
+                                           "live": stats["live"], "destroyed": stats["destroyed"]})
+            assert stats["live"] <= floating_app.settings_manager.max_live_bubbles, \
+                f"显示中的气泡{stats['live']}个，超过上限{floating_app.settings_manager.max_live_bubbles}个"
+
+    first, last = results["checkpoints"][0], results["checkpoints"][-1]
+    assert last["top_level_widgets"] <= first["top_level_widgets"], \
+        f"顶层窗口从{first['top_level_widgets']}个增加到{last['top_level_widgets']}个"
+    assert last["rss_kb"] - first["rss_kb"] <= rss_tolerance_kb, \
+        f"常驻内存增长{last['rss_kb'] - first['rss_kb']}KB，超过{rss_tolerance_kb}KB"
+    return results
+
+
+def _synthetic_corpus(total_lines, rng):
+    """按内置文本库的类别和长度分布，生成总计total_lines行的文本库"""
+    from text_styles import TEXTS_DIR
+    texts = LazyCorpus(TEXTS_DIR).load_all()
+    builtin = {category: list(texts.lines(category)) for category in texts.categories()}
+    per_category = total_lines // len(builtin)
+    alphabet = "".join(line for lines in builtin.values() for line in lines)
+    corpus = {}
+    for category, lines in builtin.items():
+        generated = []
+        for _ in range(per_category):
+            length = len(rng.choice(lines))
+            generated.append("".join(rng.choices(alphabet, k=length)))
+        corpus[category] = generated
+    return corpus
+
+
+def _traced_size(build):
+    """用tracemalloc统计build()返回的对象新增占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+@benchmark("text_corpus_memory")
+def bench_text_corpus_memory(total_lines=1000000):
+    """对比{类别: [str, ...]}与紧凑缓冲区两种文本库表示在百万行规模下的内存占用"""
+    rng = random.Random(42)
+    source = _synthetic_corpus(total_lines, rng)
+    encoded = {category: [line.encode("utf-8") for line in lines] for category, lines in source.items()}
+
+    # 从字节重新解码，确保字符串对象是在统计期间新分配的
+    dict_corpus, dict_bytes = _traced_size(
+        lambda: {category: [line.decode("utf-8") for line in lines] for category, lines in encoded.items()})
+    packed, packed_bytes = _traced_size(lambda: PackedCorpus.from_mapping(dict_corpus))
+
+    lines = sum(len(v) for v in dict_corpus.values())
+    choice_us = measure(lambda: [packed.choice("coding") for _ in range(10000)], repeat=3) / 10000 * 1e6
+    print(f"行数: {lines}，UTF-8正文: {len(packed._buffer) / 1024 / 1024:.1f} MB")
+    print(f"{'表示':<16}{'占用(MB)':>12}{'字节/行':>12}")
+    print(f"{'dict of lists':<16}{dict_bytes / 1024 / 1024:>12.1f}{dict_bytes / lines:>12.1f}")
+    print(f"{'packed buffer':<16}{packed_bytes / 1024 / 1024:>12.1f}{packed_bytes / lines:>12.1f}")
+    print(f"节省: {1 - packed_bytes / dict_bytes:.1%}，随机取一条: {choice_us:.2f} us")
+    return {"lines": lines, "dict_bytes": dict_bytes, "packed_bytes": packed_bytes,
+            "packed_nbytes": packed.nbytes(), "choice_us": choice_us}
+
+
+# 在独立进程中测量文本库启动开销，mode为eager（全部加载）、lazy（只建清单）或used（只加载可检测到的类别）
+_STARTUP_SCRIPT = """
+import json, sys, time
+from benchmarks import current_rss_kb
+from category_matcher import CATEGORY_KEYWORDS, DEFAULT_CATEGORY
+rss_before = current_rss_kb()
+start = time.perf_counter()
+from text_styles import TextStyles
+styles = TextStyles()
+mode = sys.argv[1]
+if mode == "eager":
+    styles.corpus.load_all()
+elif mode == "used":
+    for category in [DEFAULT_CATEGORY] + [c for c, _ in CATEGORY_KEYWORDS]:
+        styles.get_text(category)
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "rss_kb": current_rss_kb() - rss_before,
+                  "loaded": len(styles.corpus.loaded_categories()), "corpus_bytes": styles.corpus.nbytes()}))
+"""
+
+
+@benchmark("text_corpus_startup")
+def bench_text_corpus_startup(runs=5):
+    """对比全部加载与按需加载文本库的启动耗时和常驻内存增量（独立进程测量）"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    print(f"{'模式':<8}{'耗时(ms)':>10}{'RSS增量(KB)':>14}{'已加载类别':>12}{'文本库字节':>12}")
+    for mode in ("eager", "lazy", "used"):
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, mode], cwd=here,
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output))
+        best = min(samples, key=lambda sample: sample["ms"])
+        rss = sorted(sample["rss_kb"] for sample in samples)[len(samples) // 2]
+        print(f"{mode:<10}{best['ms']:>10.2f}{rss:>14}{best['loaded']:>12}{best['corpus_bytes']:>12}")
+        results[mode] = dict(best, rss_kb=rss)
+    return results
+
+
+def _write_text_dir(directory, mapping):
+    """把{类别: [文本, ...]}写成texts目录的格式"""
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(mapping) + "\n")
+    for category, lines in mapping.items():
+        with open(os.path.join(directory, f"{category}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+@benchmark("text_corpus_load")
+def bench_text_corpus_load(total_lines=1000000, repeat=5):
+    """对比从文本文件全部加载与mmap映射编译文件的加载耗时和Python堆占用"""
+    from text_styles import TEXTS_DIR
+    texts = LazyCorpus(TEXTS_DIR).load_all()
+    builtin = {category: list(texts.lines(category)) for category in texts.categories()}
+    synthetic = _synthetic_corpus(total_lines, random.Random(42))
+    results = {}
+
+    print(f"{'文本库':<10}{'方式':<8}{'加载(ms)':>12}{'首次取文本(us)':>16}{'Python堆(KB)':>14}{'文件(KB)':>12}")
+    for name, mapping in (("内置", builtin), ("百万行", synthetic)):
+        with tempfile.TemporaryDirectory() as directory:
+            _write_text_dir(directory, mapping)
+            compiled_path = os.path.join(directory, "corpus.bin")
+            file_size = write_compiled_corpus(compiled_path, mapping)
+            category = next(iter(mapping))
+
+            opened = []
+            loaders = (("文本文件", lambda: LazyCorpus(directory).load_all()),
+                       ("mmap", lambda: opened.append(MmapCorpus(compiled_path)) or opened[-1]))
+            for mode, load in loaders:
+                load_ms = measure(load, repeat=repeat) * 1000
+                corpus, heap_bytes = _traced_size(load)
+                start = time.perf_counter()
+                corpus.choice(category)
+                first_us = (time.perf_counter() - start) * 1e6
+                print(f"{name:<10}{mode:<10}{load_ms:>12.3f}{first_us:>16.1f}{heap_bytes / 1024:>14.1f}"
+                      f"{file_size / 1024:>12.1f}")
+                results[f"{name}/{mode}"] = {"load_ms": load_ms, "first_choice_us": first_us,
+                                             "heap_bytes": heap_bytes}
+                del corpus
+            for corpus in opened:
+                corpus.close()
+
+    return results
+
+
+def _traced_peak(func):
+    """用tracemalloc统计func()执行期间Python堆的峰值增量（字节），返回(结果, 峰值)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return result, peak
+
+
+@benchmark("streaming_corpus")
+def bench_streaming_corpus(total_lines=2000000, count=10):
+    """超大文本包：对比全部载入、磁盘偏移索引和蓄水池抽样的耗时与Python堆峰值"""
+    rng = random.Random(42)
+    bases = ["".join(rng.choices(string.ascii_letters + "浮动文字桌宠你好世界", k=rng.randint(10, 40)))
+             for _ in range(1000)]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            f.write("huge\n")
+        path = os.path.join(directory, "huge.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for index in range(total_lines):
+                f.write(f"{bases[index % len(bases)]} #{index}\n")
+        print(f"文本包: {total_lines} 行，{os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        start = time.perf_counter()
+        StreamingCorpus(directory).build_index("huge")
+        print(f"构建偏移索引: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        indexed = StreamingCorpus(directory)
+        indexed.sample("huge", count)
+        streaming = StreamingCorpus(directory, use_index=False)
+        cases = (("全部载入", lambda: LazyCorpus(directory).sample("huge", count), 1),
+                 ("偏移索引", lambda: indexed.sample("huge", count), 20),
+                 ("蓄水池抽样", lambda: streaming.sample("huge", count), 1))
+
+        print(f"{'方式':<12}{f'抽取{count}条(ms)':>16}{'Python堆峰值(KB)':>20}")
+        for name, func, repeat in cases:
+            elapsed = measure(func, repeat=repeat) * 1000
+            _, peak = _traced_peak(func)
+            print(f"{name:<12}{elapsed:>16.2f}{peak / 1024:>20.1f}")
+            results[name] = {"sample_ms": elapsed, "peak_heap_bytes": peak}
+        indexed.close()
+
+    return results
+
+
+def _total_variation(first, second):
+    """两组样本经验分布之间的总变差距离"""
+    from collections import Counter
+    first_counts, second_counts = Counter(first), Counter(second)
+    keys = set(first_counts) | set(second_counts)
+    return sum(abs(first_counts[key] / len(first) - second_counts[key] / len(second)) for key in keys) / 2
+
+
+@benchmark("generate_batch")
+def bench_generate_batch(n=1000000, category="coding", style="provocative", tone="sarcastic"):
+    """对比逐条生成与generate_batch批量生成的吞吐量，并检查两者输出分布一致"""
+    import text_styles
+    styles = text_styles.TextStyles()
+    table = text_styles.RenderTable(styles._resolve_style(style), styles._resolve_tone(tone))
+
+    def scalar():
+        rng = random.Random()
+        corpus = styles.corpus
+        total = corpus.count(category)
+        batch = []
+        for _ in range(n):
+            index = rng.randrange(total)
+            batch.append(table.render(corpus.get(category, index), corpus.ends_with_punctuation(category, index), rng))
+        return batch
+
+    results = {}
+    scalar_s = measure(scalar, repeat=1)
+    batch_s = measure(lambda: styles.generate_batch(n, category, style, tone), repeat=3)
+    print(f"{'方式':<12}{'耗时(s)':>10}{'条/秒':>14}")
+    print(f"{'逐条':<12}{scalar_s:>10.2f}{n / scalar_s:>14,.0f}")
+    print(f"{'批量(NumPy)':<12}{batch_s:>10.2f}{n / batch_s:>14,.0f}")
+    print(f"加速比: {scalar_s / batch_s:.1f}x")
+
+    # 两次逐条生成之间的距离作为抽样噪声基线
+    baseline = _total_variation(scalar(), scalar())
+    distance = _total_variation(scalar(), styles.generate_batch(n, category, style, tone))
+    print(f"输出分布总变差距离: 逐条 vs 批量 {distance:.4f}，逐条 vs 逐条 {baseline:.4f}")
+    results.update(scalar_per_second=n / scalar_s, batch_per_second=n / batch_s,
+                   distance=distance, baseline_distance=baseline)
+    return results
+
+
+@benchmark("shuffle_bag")
+def bench_shuffle_bag(draws=100000, size=20):
+    """对比random.choice与洗牌袋抽样的单次耗时和重复间隔"""
+    from shuffle_bag import ShuffleBagSampler
+    sampler = ShuffleBagSampler()
+    results = {}
+
+    def gaps(sequence):
+        last_seen = {}
+        result = []
+        for position, item in enumerate(sequence):
+            if item in last_seen:
+                result.append(position - last_seen[item])
+            last_seen[item] = position
+        return result
+
+    cases = (("random.choice", lambda: [random.randrange(size) for _ in range(draws)]),
+             ("洗牌袋", lambda: [sampler.draw("bench", size) for _ in range(draws)]))
+    print(f"类别文本数: {size}")
+    print(f"{'方式':<16}{'单次(us)':>10}{'最小重复间隔':>14}{'间隔<5的比例':>14}")
+    for name, func in cases:
+        elapsed = measure(func, repeat=3) / draws * 1e6
+        repeat_gaps = gaps(func())
+        close = sum(1 for gap in repeat_gaps if gap < 5) / len(repeat_gaps)
+        print(f"{name:<16}{elapsed:>10.2f}{min(repeat_gaps):>14}{close:>14.2%}")
+        results[name] = {"draw_us": elapsed, "min_gap": min(repeat_gaps), "close_repeat_ratio": close}
+    return results
+
+
+def _legacy_apply_style_and_tone(styles, text):
+    """原先逐条按名称查表、endswith判断再拼接的装饰实现，用作对照组"""
+    style = styles.styles.get(styles.current_style, styles.styles["funny"])
+    tone = styles.tones.get(styles.current_tone, styles.tones["normal"])
+    if random.random() < 0.3 * style["tone"]:
+        text = random.choice(style["prefix"]) + text
+    if random.random() < 0.3 * style["tone"]:
+        text = text + random.choice(style["suffix"])
+    if not text.endswith(("。", "！", "？", "～", "…", ".")):
+        text = text + random.choice(tone["punctuation"])
+    return text
+
+
+@benchmark("render_table")
+def bench_render_table(draws=200000, category="coding"):
+    """对比原先逐条查表装饰与预计算渲染表（带装饰结果缓存）的单条耗时，并检查输出分布一致"""
+    import text_styles
+    styles = text_styles.TextStyles()
+    styles.set_style("provocative")
+    styles.set_tone("sarcastic")
+    corpus = styles.corpus
+    total = corpus.count(category)
+    indexes = [random.randrange(total) for _ in range(draws)]
+
+    def legacy():
+        return [_legacy_apply_style_and_tone(styles, corpus.get(category, index)) for index in indexes]
+
+    def table():
+        render = styles._render
+        return [render(category, index) for index in indexes]
+
+    legacy_us = measure(legacy, repeat=7) / draws * 1e6
+    table_us = measure(table, repeat=7) / draws * 1e6
+    distance = _total_variation(legacy(), table())
+    baseline = _total_variation(legacy(), legacy())
+    stats = styles.render_table().get_stats()
+    print(f"{'方式':<14}{'单条(us)':>10}")
+    print(f"{'逐条查表':<14}{legacy_us:>10.2f}")
+    print(f"{'渲染表':<14}{table_us:>10.2f}")
+    print(f"加速比: {legacy_us / table_us:.2f}x，装饰缓存命中率: {stats['hit_rate']:.1%}（{stats['size']}项）")
+    print(f"输出分布总变差距离: 原实现 vs 渲染表 {distance:.4f}，原实现 vs 原实现 {baseline:.4f}")
+    return {"legacy_us": legacy_us, "table_us": table_us, "cache": stats,
+            "distance": distance, "baseline_distance": baseline}
+
+
+@benchmark("message_pipeline")
+def bench_message_pipeline(ticks=300, count=3):
+    """对比界面线程上每次显示的准备耗时（取文本+确定气泡大小）：原实现、现场生成、预生成队列"""
+    qt_app()
+    import main_enhanced_with_super_library_bugfixed as app_main
+    from message_pipeline import MessagePipeline
+    from text_styles import TextStyles
+
+    text_styles = TextStyles()
+    pipeline = MessagePipeline(text_styles, app_main.bubble_text_measurer)
+    windows = [app_main.FloatingTextWindow() for _ in range(count)]
+
+    def legacy():
+        # 原实现：界面线程上抽样装饰文本，窗口自行确定大小
+        for window, text in zip(windows, text_styles.get_random_texts(count, "coding")):
+            window.reset(text)
+
+    def pipelined():
+        for window, message in zip(windows, pipeline.take(count)):
+            window.reset(message.text, message.size)
+        pipeline.refill()
+
+    def run(prepare):
+        samples = []
+        for _ in range(ticks):
+            # 两次显示之间的间隔，工作线程在此期间补充队列（各方式都等待，避免缓存冷热不同）
+            time.sleep(0.005)
+            start = time.perf_counter()
+            prepare()
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        return samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.95)] * 1e6
+
+    results = {}
+    pipeline.configure(category="coding")
+    print(f"{'方式':<16}{'中位数(us/次)':>16}{'P95(us/次)':>14}")
+    for name, prepare, background in (("原实现", legacy, False), ("现场生成", pipelined, False),
+                                      ("预生成队列", pipelined, True)):
+        if background:
+            pipeline.start()
+        median, p95 = run(prepare)
+        print(f"{name:<16}{median:>16.1f}{p95:>14.1f}")
+        results[name] = {"median_us": median, "p95_us": p95}
+    pipeline.stop()
+    for window in windows:
+        window.deleteLater()
+    return results
+
+
+@benchmark("bubble_metrics")
+def bench_bubble_metrics(texts=300, rounds=5):
+    """对比确定气泡大小的耗时：原实现（新建字体+布局计算）、共享字体直接排版、尺寸缓存命中"""
+    qt_app()
+    from PyQt5.QtGui import QFont, QFontMetrics
+    import main_enhanced_with_super_library_bugfixed as app_main
+    from text_styles import TextStyles
+
+    text_styles = TextStyles()
+    samples = [text_styles.get_text(category) for category in text_styles.get_all_categories()
+               for _ in range(max(1, texts // len(text_styles.get_all_categories())))]
+    window = app_main.FloatingTextWindow()
+    cache = app_main.BubbleMetricsCache(max_size=len(samples))
+
+    def legacy():
+        # 原实现：每个气泡新建字体（首选字体缺失时回退查找），再由布局计算大小
+        for text in samples:
+            font = QFont("微软雅黑", 12)
+            font.setBold(True)
+            window.label.setFont(font)
+            window.label.setText(text)
+            window.adjustSize()
+
+    def uncached():
+        metrics = QFontMetrics(app_main.bubble_font())
+        for text in samples:
+            app_main.measure_bubble_text(metrics, text)
+
+    def cached():
+        for _ in range(rounds):
+            for text in samples:
+                cache.size(text)
+
+    for text in samples:
+        cache.size(text)
+    legacy_us = measure(legacy) / len(samples) * 1e6
+    uncached_us = measure(uncached) / len(samples) * 1e6
+    cached_us = measure(cached) / (len(samples) * rounds) * 1e6
+    window.deleteLater()
+
+    print(f"{'方式':<16}{'耗时(us/条)':>14}")
+    for name, value in (("原实现", legacy_us), ("共享字体排版", uncached_us), ("尺寸缓存命中", cached_us)):
+        print(f"{name:<16}{value:>14.1f}")
+    print(f"缓存命中率: {cache.get_stats()['hit_rate']:.2%}（{len(samples)}条文本）")
+
+    # 字形预热：预热整个文本库的总耗时（分摊到启动后的空闲片段中）
+    warmer = app_main.GlyphWarmer("".join(text_styles.corpus.lines(category))
+                                  for category in text_styles.get_all_categories())
+    while True:
+        warmer.timer.start()
+        warmer.step()
+        if not warmer.timer.isActive():
+            break
+    print(f"字形预热: {len(warmer.seen)}个字符，共{warmer.elapsed * 1000:.1f}ms")
+    return {"legacy_us": legacy_us, "uncached_us": uncached_us, "cached_us": cached_us,
+            "glyphs": len(warmer.seen), "warmup_ms": warmer.elapsed * 1000}
+
+
+@benchmark("settings_writes")
+def bench_settings_writes(updates=5000, interval=0.0002, save_delay=50):
+    """模拟拖动气泡时的连续位置更新，统计实际写盘次数（对比每次更新都写盘）
+
+    同一轮事件循环内的突发更新只能写盘1次；持续拖动时每个save_delay最多写盘1次，再加上结束后的1次
+    """
+    app = qt_app()
+    from PyQt5.QtCore import QPoint
+    import main_enhanced_with_super_library_bugfixed as app_main
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "settings.json")
+
+        def drag(settings, pause):
+            start = time.perf_counter()
+            for i in range(updates):
+                settings.set_position(QPoint(i, updates - i))
+                if pause:
+                    app.processEvents()
+                    time.sleep(pause)
+            elapsed = time.perf_counter() - start
+            # 等待最后一次延迟写盘
+            deadline = time.perf_counter() + save_delay / 1000.0 * 4
+            while settings.save_timer.isActive() and time.perf_counter() < deadline:
+                app.processEvents()
+                time.sleep(0.001)
+            return elapsed
+
+        print(f"{'场景':<12}{'更新次数':>10}{'写盘次数':>10}{'耗时(ms)':>12}")
+        for name, pause in (("连续突发", 0), ("持续拖动", interval)):
+            settings = app_main.SettingsManager(path, save_delay)
+            elapsed = drag(settings, pause)
+            restored = app_main.SettingsManager(path).position
+            assert (restored.x(), restored.y()) == (updates - 1, 1), "写盘结果与最终位置不一致"
+            limit = math.ceil(elapsed * 1000 / save_delay) + 1 if pause else 1
+            print(f"{name:<12}{updates:>10}{settings.writes:>10}{elapsed * 1000:>12.1f}")
+            if pause:
+                assert 1 <= settings.writes <= limit, f"{name}写盘{settings.writes}次，超过上限{limit}次"
+            else:
+                assert settings.writes == 1, f"{name}写盘{settings.writes}次，应为1次"
+            results[name] = {"updates": updates, "writes": settings.writes, "elapsed_ms": elapsed * 1000}
+
+        # 对比：每次更新都原子写盘
+        data = app_main.SettingsManager().to_dict()
+        per_write = measure(lambda: [app_main.write_json_atomic(path, data) for _ in range(50)]) / 50
+        print(f"每次更新都写盘: {updates}次写入，预计{per_write * updates * 1000:.1f}ms")
+        results["write_every_update_ms"] = per_write * updates * 1000
+    return results
+
+
+@benchmark("settings_batch")
+def bench_settings_batch(rounds=200):
+    """对比设置对话框保存时逐项通知与批量通知的通知次数"""
+    qt_app()
+    import main_enhanced_with_super_library_bugfixed as app_main
+
+    def apply(settings, index):
+        # 与设置对话框保存时相同的八项修改
+        settings.set_presence_value(index % 100)
+        settings.set_message_count(index % 5 + 1)
+        settings.set_edge_adsorption(index % 2 == 0)
+        settings.set_mouse_following(index % 2 == 1)
+        settings.set_fixed_position(index % 2 == 0)
+        settings.set_overlay_mode(False)
+        settings.set_autostart(False)
+        settings.set_adaptive_scheduling(index % 2 == 1)
+
+    results = {}
+    print(f"{'方式':<10}{'通知次数/次保存':>18}{'耗时(us/次保存)':>18}")
+    for name, batched in (("逐项通知", False), ("批量通知", True)):
+        settings = app_main.SettingsManager()
+        notifications = []
+        settings.settingsChanged.connect(notifications.append)
+        start = time.perf_counter()
+        for index in range(1, rounds + 1):
+            if batched:
+                with settings.batch():
+                    apply(settings, index)
+            else:
+                apply(settings, index)
+        elapsed = time.perf_counter() - start
+        per_save = len(notifications) / rounds
+        print(f"{name:<10}{per_save:>18.1f}{elapsed / rounds * 1e6:>18.1f}")
+        results[name] = {"notifications_per_save": per_save, "us_per_save": elapsed / rounds * 1e6}
+    return results
+
+
+@benchmark("message_scheduler")
+def bench_message_scheduler(hours=24, extra_events=50, coalesce=2.0):
+    """模拟一天的调度：每个事件一个定时器与调度器合并唤醒的唤醒次数，以及大量事件时的调度开销"""
+    results = {}
+    print(f"{'事件数':>8}{'触发次数':>10}{'独立定时器唤醒':>16}{'合并后唤醒':>12}{'us/次唤醒':>12}")
+    for count in (3, 3 + extra_events, 3 + extra_events * 20):
+        now = [1700000000.0]
+        scheduler = MessageScheduler(clock=lambda: now[0], rng=random.Random(1), coalesce=coalesce,
+                                     category_provider=lambda: "coding", wall_clock=lambda: now[0])
+        scheduler.add("tick", 60.0, jitter=0.2)
+        scheduler.add("rest", 45 * 60.0, category="rest_reminder", jitter=0.1)
+        scheduler.add("late_night", 30 * 60.0, category="late_night_work", active_hours=(23 * 60, 5 * 60))
+        for index in range(count - 3):
+            scheduler.add(f"extra{index}", 600.0, category=f"extra{index}", jitter=0.5)
+
+        end = now[0] + hours * 3600
+        fired = 0
+        start = time.perf_counter()
+        while True:
+            deadline = scheduler.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            now[0] = max(now[0], deadline)
+            fired += len(scheduler.run_due())
+        elapsed = time.perf_counter() - start
+        # 每个事件各自一个定时器时，每次触发或推迟都是一次唤醒
+        separate = sum(stats["fired"] + stats["deferred"] for stats in scheduler.get_stats()["events"].values())
+        wakeups = scheduler.wakeups
+        print(f"{count:>8}{fired:>10}{separate:>16}{wakeups:>12}{elapsed / wakeups * 1e6:>12.1f}")
+        results[count] = {"fired": fired, "separate_wakeups": separate, "wakeups": wakeups,
+                          "us_per_wakeup": elapsed / wakeups * 1e6}
+    return results
+
+
+@benchmark("determine_category")
+def bench_determine_category(titles=100000):
+    """活动类别判断的吞吐量：逐条匹配、批量匹配和带缓存的判断（窗口标题大多重复出现）"""
+    from category_matcher import CategoryCache
+    import main_enhanced_with_super_library_bugfixed as app_main
+
+    rng = random.Random(7)
+    samples = [rng.choice(SAMPLE_TITLES) for _ in range(titles)]
+    matcher = app_main.CATEGORY_MATCHER
+
+    def cached():
+        cache = CategoryCache(matcher)
+        for title in samples:
+            cache.classify(title)
+
+    results = {}
+    print(f"{'方式':<10}{'吞吐量(条/秒)':>16}")
+    for name, run in (("match", lambda: [matcher.match(title) for title in samples]),
+                      ("match_many", lambda: matcher.match_many(samples)),
+                      ("cached", cached)):
+        rate = titles / measure(run, repeat=3)
+        print(f"{name:<10}{rate:>16.0f}")
+        results[f"{name}_per_second"] = rate
+    return results
+
+
+@benchmark("text_throughput")
+def bench_text_throughput(draws=50000):
+    """文本生成吞吐量：get_text、get_random_texts以及每种风格和语气组合的装饰"""
+    from text_styles import TextStyles
+
+    text_styles = TextStyles()
+    categories = text_styles.get_all_categories()
+    rng = random.Random(3)
+    picks = [rng.choice(categories) for _ in range(draws)]
+    raw = [text_styles.corpus.get(category, 0) for category in categories]
+
+    results = {}
+    print(f"{'操作':<28}{'吞吐量(条/秒)':>16}")
+    rate = draws / measure(lambda: [text_styles.get_text(category) for category in picks], repeat=3)
+    print(f"{'get_text':<28}{rate:>16.0f}")
+    results["get_text_per_second"] = rate
+    rate = draws * 3 / measure(lambda: [text_styles.get_random_texts(3, category) for category in picks], repeat=3)
+    print(f"{'get_random_texts(3)':<28}{rate:>16.0f}")
+    results["get_random_texts_per_second"] = rate
+
+    for style in text_styles.styles:
+        for tone in text_styles.tones:
+            text_styles.set_style(style)
+            text_styles.set_tone(tone)
+            count = draws // 10
+            rate = count / measure(lambda: [text_styles._apply_style_and_tone(raw[i % len(raw)])
+                                            for i in range(count)], repeat=3)
+            print(f"{'装饰 ' + style + '/' + tone:<28}{rate:>16.0f}")
+            results[f"apply_{style}_{tone}_per_second"] = rate
+    return results
+
+
+@benchmark("bubble_window")
+def bench_bubble_window(windows=200):
+    """浮动窗口的创建耗时、每种背景样式的完整绘制耗时（含文字）和每个气泡的内存"""
+    app = qt_app()
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage
+    import main_enhanced_with_super_library_bugfixed as app_main
+    from text_styles import TextStyles
+
+    text_styles = TextStyles()
+    texts = text_styles.get_random_texts(windows, "coding")
+    results = {}
+
+    created = []
+    start = time.perf_counter()
+    for text in texts:
+        created.append(app_main.FloatingTextWindow(text))
+    results["construct_us"] = (time.perf_counter() - start) / windows * 1e6
+    print(f"创建浮动窗口: {results['construct_us']:.1f} us/个")
+
+    window = created[0]
+    target = QImage(window.size(), QImage.Format_ARGB32_Premultiplied)
+    frames = 200
+    print(f"{'背景样式':<8}{'绘制(us/帧)':>14}")
+    for bg_style in range(4):
+        window.bg_style = bg_style
+
+        def paint():
+            for _ in range(frames):
+                target.fill(Qt.transparent)
+                window.render(target)
+
+        paint_us = measure(paint) / frames * 1e6
+        print(f"{bg_style:<12}{paint_us:>14.1f}")
+        results[f"paint_style{bg_style}_us"] = paint_us
+    for widget in created:
+        widget.deleteLater()
+    app.processEvents()
+
+    # 每个显示中的气泡的常驻内存（创建并显示一批后按RSS增量平均）
+    for mode in ("window", "overlay"):
+        overlay = app_main.BubbleOverlay() if mode == "overlay" else None
+        before = current_rss_kb()
+        bubbles = []
+        for text in texts:
+            bubble = app_main.FloatingTextWindow() if overlay is None else app_main.OverlayBubble(overlay)
+            bubble.reset(text)
+            bubble.set_random_position(False)
+            bubble.show_with_animation()
+            bubbles.append(bubble)
+        app.processEvents()
+        per_bubble = (current_rss_kb() - before) / windows
+        print(f"每个气泡内存（{mode}）: {per_bubble:.1f} KB")
+        results[f"memory_{mode}_kb"] = per_bubble
+        for bubble in bubbles:
+            bubble.close()
+            bubble.deleteLater()
+        if overlay is not None:
+            overlay.close()
+        app.processEvents()
+    return results
+
+
+@benchmark("display_latency")
+def bench_display_latency(calls=100):
+    """display_random_text端到端耗时（取文本、复用或创建气泡、定位并开始显示），消息数量1到5"""
+    app = qt_app()
+    results = {}
+    with floating_text_app() as floating_app:
+        app.processEvents()  # 完成首帧之后的启动工作
+        floating_app.display_timer.stop()
+        print(f"{'消息数量':<8}{'中位数(us)':>12}{'P95(us)':>12}")
+        for count in range(1, 6):
+            floating_app.settings_manager.message_count = count
+            samples = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                floating_app.display_random_text()
+                samples.append(time.perf_counter() - start)
+                app.processEvents()
+            samples.sort()
+            median, p95 = samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.95)] * 1e6
+            print(f"{count:<12}{median:>12.1f}{p95:>12.1f}")
+            results[f"count{count}"] = {"median_us": median, "p95_us": p95}
+    return results
+
+
+@benchmark("metrics_overhead")
+def bench_metrics_overhead(calls=200000):
+    """指标关闭与开启时，计数、计时上下文和计时装饰器每次调用的额外开销"""
+    from metrics import MetricsRegistry, timed
+
+    def noop():
+        pass
+
+    results = {}
+    print(f"{'状态':<8}{'计数(ns)':>12}{'计时上下文(ns)':>16}{'装饰器额外(ns)':>16}")
+    for name, enabled in (("关闭", False), ("开启", True)):
+        registry = MetricsRegistry(enabled=enabled)
+        counter = registry.counter("calls_total")
+        histogram = registry.histogram("call_seconds")
+        wrapped = timed(histogram)(noop)
+
+        def count():
+            for _ in range(calls):
+                counter.inc()
+
+        def time_block():
+            for _ in range(calls):
+                with histogram.time():
+                    pass
+
+        def bare_calls():
+            for _ in range(calls):
+                noop()
+
+        def timed_calls():
+            for _ in range(calls):
+                wrapped()
+
+        inc_ns = measure(count) / calls * 1e9
+        timer_ns = measure(time_block) / calls * 1e9
+        decorator_ns = (measure(timed_calls) - measure(bare_calls)) / calls * 1e9
+        print(f"{name:<8}{inc_ns:>12.1f}{timer_ns:>16.1f}{decorator_ns:>16.1f}")
+        results[name] = {"inc_ns": inc_ns, "timer_ns": timer_ns, "decorator_ns": decorator_ns}
+    return results
+
+
+@benchmark("logging_storm")
+def bench_logging_storm(records=20000):
+    """错误风暴（同一条绘制错误连续记录）时，调用方每条日志的耗时和最终写入文件的行数"""
+    import logging
+    import tempfile
+    from log_pipeline import LOG_FORMAT, LogPipeline
+
+    results = {}
+    print(f"{'方式':<10}{'调用方(us/条)':>16}{'最慢一条(us)':>14}{'写入行数':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("同步写文件", "日志流水线"):
+            path = os.path.join(directory, f"{name}.log")
+            logger = logging.getLogger(f"bench.logging_storm.{name}")
+            logger.propagate = False
+            if name == "同步写文件":
+                # 与原先basicConfig(filename=...)相同的处理器
+                handler = logging.FileHandler(path, encoding="utf-8")
+                handler.setFormatter(logging.Formatter(LOG_FORMAT))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                stop = handler.close
+            else:
+                stop = LogPipeline(path).install(logger).stop
+
+            worst = 0.0
+            start = time.perf_counter()
+            for index in range(records):
+                before = time.perf_counter()
+                logger.error(f"绘制错误: {'QPainter::begin: Paint device returned engine == 0'}")
+                worst = max(worst, time.perf_counter() - before)
+            elapsed = time.perf_counter() - start
+            stop()
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+
+            with open(path, encoding="utf-8") as f:
+                lines = sum(1 for _ in f)
+            print(f"{name:<10}{elapsed / records * 1e6:>16.2f}{worst * 1e6:>14.1f}{lines:>10}")
+            results[name] = {"caller_us": elapsed / records * 1e6, "worst_us": worst * 1e6, "lines": lines}
+    return results
+
+
+@benchmark("app_startup")
+def bench_app_startup(runs=5):
+    """主程序各启动阶段耗时（独立进程运行--profile-startup，取每个阶段的中位数）"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = os.path.join(here, "main_enhanced_with_super_library_bugfixed.py")
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    samples = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(runs):
+            # 设置和抽样状态也写在临时目录中，不覆盖用户的文件
+            output = subprocess.run([sys.executable, script, "--profile-startup", "--data-dir", directory],
+                                    cwd=directory, env=env, capture_output=True, text=True, encoding="utf-8",
+                                    check=True).stdout
+            for line in output.splitlines():
+                name, _, value = line.rpartition(" ms")[0].rpartition(" ")
+                if name.strip():
+                    samples.setdefault(name.strip(), []).append(float(value))
+
+    results = {}
+    print(f"{'阶段':<14}{'中位数(ms)':>12}")
+    for name, values in samples.items():
+        values.sort()
+        results[f"{name}_ms"] = values[len(values) // 2]
+        print(f"{name:<14}{values[len(values) // 2]:>12.1f}")
+    return results
+
+
+# 指标名称的单位后缀决定比较方向：耗时和内存越小越好，吞吐量和命中率越大越好
+LOWER_IS_BETTER = re.compile(r"(_ns|_us|_ms|_kb|_bytes|^us_per_\w+|^ms_per_\w+)$")
+HIGHER_IS_BETTER = re.compile(r"(_per_second|hit_rate)$")
+
+
+def run_metadata():
+    """本次运行的环境信息（写入结果文件，便于比较不同机器上的结果）"""
+    from PyQt5.QtCore import QT_VERSION_STR
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qt": QT_VERSION_STR,
+        "qpa": os.environ.get("QT_QPA_PLATFORM", ""),
+    }
+
+
+def flatten_metrics(value, prefix=""):
+    """把嵌套的结果展开为{"基准.键.子键": 数值}"""
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {prefix: float(value)}
+    items = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+    metrics = {}
+    for key, child in items:
+        metrics.update(flatten_metrics(child, f"{prefix}.{key}" if prefix else str(key)))
+    return metrics
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """与基线结果比较并打印变化，返回超出阈值的回归项"""
+    current = flatten_metrics(results)
+    previous = flatten_metrics(baseline.get("results", {}))
+    regressions = []
+    print(f"== 与基线比较（{baseline.get('meta', {}).get('time', '未知时间')}）==")
+    print(f"{'指标':<48}{'基线':>14}{'本次':>14}{'变化':>10}")
+    for path in sorted(current.keys() & previous.keys()):
+        old, new = previous[path], current[path]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        key = path.rsplit(".", 1)[-1]
+        mark = ""
+        if LOWER_IS_BETTER.search(key):
+            mark = "回归" if change > threshold else "改进" if change < -threshold else ""
+        elif HIGHER_IS_BETTER.search(key):
+            mark = "回归" if change < -threshold else "改进" if change > threshold else ""
+        if mark == "回归":
+            regressions.append(path)
+        print(f"{path:<48}{old:>14.2f}{new:>14.2f}{change:>+10.1%} {mark}")
+    print(f"共比较{len(current.keys() & previous.keys())}项，回归{len(regressions)}项（阈值{threshold:.0%}）")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="浮动文字桌宠性能基准测试")
+    parser.add_argument("names", nargs="*", help=f"要运行的基准（默认全部）: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    parser.add_argument("--baseline", help="与之前保存的JSON结果比较，有回归时返回1")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定回归的相对变化阈值（默认0.1）")
+    args = parser.parse_args(argv)
+
+    names = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知的基准测试: {name}（可选: {', '.join(BENCHMARKS)}）")
+            return 1
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = {}
+    for name in names:
+        print(f"== {name} ==")
+        results[name] = BENCHMARKS[name]()
+        print()
+    # 经过一次JSON往返，保证与读回的基线结构一致（如整数键变为字符串）
+    results = json.loads(json.dumps(results, ensure_ascii=False, default=str))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": run_metadata(), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_with_baseline(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
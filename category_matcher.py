@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 活动类别匹配器
+将窗口标题关键词表编译为Aho-Corasick自动机，一次扫描即可得出活动类别
+"""
+
+from collections import OrderedDict
+
+# 关键词表 - 按优先级排列，越靠前优先级越高（与原先的if链顺序一致）
+CATEGORY_KEYWORDS = [
+    # 编程相关
+    ("coding", ["vscode", "visual studio", "pycharm", "intellij", "eclipse", "sublime",
+                "notepad++", "vim", "emacs", "atom", "code", "编辑器", "editor", "ide"]),
+    # 浏览器相关
+    ("browsing", ["chrome", "firefox", "edge", "safari", "opera", "浏览器", "browser",
+                  "internet explorer", "百度", "google", "bing", "搜索", "search"]),
+    # 视频相关
+    ("video", ["video", "youtube", "bilibili", "哔哩哔哩", "优酷", "腾讯视频", "爱奇艺",
+               "netflix", "播放器", "player", "movie", "电影", "视频"]),
+    # 办公相关
+    ("office", ["word", "excel", "powerpoint", "office", "文档", "表格", "演示", "document",
+                "spreadsheet", "presentation", "wps", "金山", "pdf"]),
+    # 游戏相关
+    ("gaming", ["game", "steam", "epic", "origin", "uplay", "battle.net", "游戏", "lol",
+                "dota", "cs", "minecraft", "我的世界"]),
+    # 系统相关
+    ("system", ["设置", "控制面板", "任务管理器", "资源管理器", "settings", "control panel",
+                "task manager", "explorer", "system", "系统"]),
+    # 聊天相关
+    ("chat", ["微信", "qq", "wechat", "telegram", "whatsapp", "discord", "slack", "teams",
+              "聊天", "chat", "消息", "message"]),
+    # 音乐相关
+    ("music", ["music", "spotify", "网易云音乐", "qq音乐", "酷狗", "酷我", "apple music",
+               "itunes", "音乐", "播放器", "player"]),
+    # 阅读相关
+    ("reading", ["reader", "pdf", "book", "阅读器", "电子书", "kindle", "小说", "novel",
+                 "article", "文章"]),
+]
+
+DEFAULT_CATEGORY = "general"
+
+
+class CategoryMatcher:
+    """窗口标题类别匹配器（Aho-Corasick多模式匹配）"""
+
+    def __init__(self, keyword_table=None, default=DEFAULT_CATEGORY):
+        if keyword_table is None:
+            keyword_table = CATEGORY_KEYWORDS
+        self.default = default
+        self.categories = [category for category, _ in keyword_table]
+        self.keyword_count = sum(len(keywords) for _, keywords in keyword_table)
+        self._build(keyword_table)
+
+    def _build(self, keyword_table):
+        """构建自动机：goto表、失败指针和每个状态可达的最高优先级"""
+        no_match = len(self.categories)
+        self._goto = [{}]
+        self._best = [no_match]
+
+        # 插入关键词，同一关键词出现在多个类别时取优先级最高的
+        for priority, (_, keywords) in enumerate(keyword_table):
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    next_state = self._goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][char] = next_state
+                        self._goto.append({})
+                        self._best.append(no_match)
+                    state = next_state
+                if priority < self._best[state]:
+                    self._best[state] = priority
+
+        # 广度优先计算失败指针，并沿失败链合并输出优先级
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fallback = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fallback if fallback != next_state else 0
+                if self._best[self._fail[next_state]] < self._best[next_state]:
+                    self._best[next_state] = self._best[self._fail[next_state]]
+                queue.append(next_state)
+
+    def match(self, window_title):
+        """根据窗口标题判断活动类别"""
+        goto = self._goto
+        fail = self._fail
+        best = self._best
+        found = len(self.categories)
+        state = 0
+
+        for char in window_title.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] < found:
+                found = best[state]
+                # 已命中最高优先级类别，无需继续扫描
+                if found == 0:
+                    break
+
+        if found < len(self.categories):
+            return self.categories[found]
+        return self.default
+
+    def match_many(self, window_titles):
+        """批量判断活动类别，适合离线重新分类活动日志"""
+        match = self.match
+        return [match(title) for title in window_titles]
+
+
+class CategoryCache:
+    """窗口标题到活动类别的LRU缓存，带标题未变化的快速路径"""
+
+    def __init__(self, matcher, max_size=256):
+        self.matcher = matcher
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._last_title = None
+        self._last_category = None
+
+        # 统计计数
+        self.unchanged = 0   # 标题与上次相同，直接跳过
+        self.hits = 0        # 缓存命中
+        self.misses = 0      # 缓存未命中，需要重新匹配
+        self.evictions = 0   # 因超出容量被淘汰的条目
+
+    def classify(self, window_title):
+        """返回窗口标题对应的活动类别"""
+        # 快速路径：前台窗口没有变化
+        if window_title == self._last_title:
+            self.unchanged += 1
+            return self._last_category
+
+        category = self._cache.get(window_title)
+        if category is not None:
+            self.hits += 1
+            self._cache.move_to_end(window_title)
+        else:
+            self.misses += 1
+            category = self.matcher.match(window_title)
+            self._cache[window_title] = category
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+        self._last_title = window_title
+        self._last_category = category
+        return category
+
+    def clear(self):
+        """清空缓存（计数保留）"""
+        self._cache.clear()
+        self._last_title = None
+        self._last_category = None
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        lookups = self.unchanged + self.hits + self.misses
+        saved = self.unchanged + self.hits
+        return {
+            "unchanged": self.unchanged,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._cache),
+            "saved_ratio": saved / lookups if lookups else 0.0,
+        }
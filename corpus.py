@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 文本库存储
+紧凑的文本库表示：所有文本存放在一个UTF-8缓冲区中，每个类别一张偏移表，抽取时才解码
+文本库数据放在texts目录下，每个类别一个文本文件，可按需延迟加载
+也可以由corpus_compiler.py编译成二进制文件，运行时直接mmap映射，多个进程共享同一份页缓存
+超出内存的大型第三方文本包通过流式读取和磁盘偏移索引抽样，内存占用与文本包大小无关
+"""
+
+import os
+import sys
+import math
+import mmap
+import json
+import random
+import struct
+import logging
+from itertools import islice
+from array import array
+from collections.abc import Mapping
+
+# 类别清单文件名（位于文本库目录中）
+MANIFEST_FILE = "manifest.txt"
+
+# 以这些标点结尾的文本不需要再追加语气标点（加载时按UTF-8字节预先判断）
+ENDING_PUNCTUATION = ("。", "！", "？", "～", "…", ".")
+ENDING_BYTES = tuple(mark.encode("utf-8") for mark in ENDING_PUNCTUATION)
+ENDING_WIDTH = max(len(mark) for mark in ENDING_BYTES)
+
+# 编译后的二进制文本库文件名（位于文本库目录中）
+COMPILED_FILE = "corpus.bin"
+
+# 二进制格式：文件头 | 类别索引 | 各类别偏移表 | 元数据(JSON) | UTF-8正文，全部小端序，各段4字节对齐
+# 文件头: 魔数, 版本, 保留, 类别数, 索引偏移, 元数据偏移, 元数据长度, 正文偏移, 正文长度
+CORPUS_MAGIC = b"FTCORPUS"
+CORPUS_VERSION = 1
+HEADER_FORMAT = struct.Struct("<8sHHIIIIII")
+# 类别索引项: 文本条数, 起始偏移表位置（其后紧跟同样长度的结束偏移表）
+INDEX_FORMAT = struct.Struct("<II")
+
+# 流式文本包的磁盘偏移索引：文件头(魔数, 源文件大小, 源文件修改时间) + 每条文本起始位置(uint64)
+LINE_INDEX_SUFFIX = ".idx"
+LINE_INDEX_MAGIC = b"FTLNIDX1"
+LINE_INDEX_HEADER = struct.Struct("<8sQQ")
+LINE_INDEX_ENTRY = struct.Struct("<Q")
+
+
+def read_text_file(path):
+    """读取文本文件：每行一条，忽略空行和#开头的注释行"""
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line.strip() and not line.startswith("#")]
+
+
+class PackedCorpus:
+    """紧凑文本库：共享UTF-8缓冲区 + 每个类别的起止偏移表，相同文本只存一份"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._tables = {}  # 类别 -> (起始偏移array, 结束偏移array)
+        self._ends = {}    # 类别 -> 每条文本是否已以标点结尾（bytearray）
+        self.meta = {}     # 附带的元数据（如风格和语气库）
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        """从{类别: [文本, ...]}构建"""
+        corpus = cls()
+        for category, lines in mapping.items():
+            corpus.add_category(category, lines)
+        return corpus
+
+    def add_category(self, category, lines):
+        """追加一个类别，同一批次内重复的文本只存一份"""
+        interned = {}
+        starts = array("I")
+        ends = array("I")
+        flags = bytearray()
+        for line in lines:
+            data = line.encode("utf-8")
+            start = interned.get(data)
+            if start is None:
+                start = len(self._buffer)
+                self._buffer += data
+                interned[data] = start
+            starts.append(start)
+            ends.append(start + len(data))
+            flags.append(data.endswith(ENDING_BYTES))
+        self._tables[category] = (starts, ends)
+        self._ends[category] = flags
+
+    def _table(self, category):
+        """类别的偏移表"""
+        return self._tables[category]
+
+    def categories(self):
+        """所有类别（按添加顺序）"""
+        return list(self._tables)
+
+    def __contains__(self, category):
+        return category in self._tables
+
+    def count(self, category):
+        """类别中的文本数量"""
+        return len(self._table(category)[0])
+
+    def get(self, category, index):
+        """解码类别中的第index条文本"""
+        starts, ends = self._table(category)
+        return str(self._buffer[starts[index]:ends[index]], "utf-8")
+
+    def lines(self, category):
+        """逐条解码类别中的全部文本"""
+        for index in range(self.count(category)):
+            yield self.get(category, index)
+
+    def choice(self, category):
+        """随机取一条文本"""
+        return self.get(category, random.randrange(self.count(category)))
+
+    def sample(self, category, count):
+        """不重复地随机取count条文本（不足count条时全部取出）"""
+        total = self.count(category)
+        indexes = random.sample(range(total), min(count, total))
+        return [self.get(category, index) for index in indexes]
+
+    def ends_with_punctuation(self, category, index):
+        """第index条文本是否已以标点结尾"""
+        flags = self._ends.get(category)
+        if flags is None:
+            flags = self._ends[category] = self._ending_flags(category)
+        return flags[index] == 1
+
+    def _ending_flags(self, category):
+        """直接比较每条文本末尾的UTF-8字节，无需解码"""
+        starts, ends = self._table(category)
+        buffer = self._buffer
+        return bytearray(bytes(buffer[max(start, end - ENDING_WIDTH):end]).endswith(ENDING_BYTES)
+                         for start, end in zip(starts, ends))
+
+    def nbytes(self):
+        """缓冲区和偏移表占用的字节数"""
+        size = len(self._buffer)
+        for starts, ends in self._tables.values():
+            size += starts.itemsize * len(starts) + ends.itemsize * len(ends)
+        return size
+
+
+class LazyCorpus(PackedCorpus):
+    """按需加载的紧凑文本库：类别清单启动时读取，类别文本第一次被访问时才从文件载入"""
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self._manifest = read_text_file(os.path.join(directory, MANIFEST_FILE))
+        self._known = set(self._manifest)
+
+    def _table(self, category):
+        table = self._tables.get(category)
+        if table is None:
+            if category not in self._known:
+                raise KeyError(category)
+            lines = read_text_file(os.path.join(self.directory, f"{category}.txt"))
+            self.add_category(category, lines)
+            logging.debug(f"文本库类别已加载: {category}（{len(lines)}条）")
+            table = self._tables[category]
+        return table
+
+    def categories(self):
+        """所有类别（按清单顺序，不触发加载）"""
+        return list(self._manifest)
+
+    def __contains__(self, category):
+        return category in self._known
+
+    def loaded_categories(self):
+        """已经载入内存的类别"""
+        return list(self._tables)
+
+    def load_all(self):
+        """立即载入全部类别"""
+        for category in self._manifest:
+            self._table(category)
+        return self
+
+
+def _align(offset):
+    """向上对齐到4字节"""
+    return (offset + 3) & ~3
+
+
+def write_compiled_corpus(path, mapping, meta=None):
+    """把{类别: [文本, ...]}和元数据写成二进制文本库，返回写入的字节数"""
+    packed = PackedCorpus.from_mapping(mapping)
+    categories = packed.categories()
+    meta = dict(meta or {}, categories=categories)
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+
+    index_offset = HEADER_FORMAT.size
+    tables = []
+    offset = _align(index_offset + INDEX_FORMAT.size * len(categories))
+    for category in categories:
+        starts, ends = packed._tables[category]
+        tables.append((offset, starts, ends))
+        offset += (len(starts) + len(ends)) * starts.itemsize
+    meta_offset = offset
+    payload_offset = _align(meta_offset + len(meta_bytes))
+
+    header = HEADER_FORMAT.pack(CORPUS_MAGIC, CORPUS_VERSION, 0, len(categories), index_offset,
+                                meta_offset, len(meta_bytes), payload_offset, len(packed._buffer))
+    out = bytearray(header)
+    for table_offset, starts, _ in tables:
+        out += INDEX_FORMAT.pack(len(starts), table_offset)
+    for table_offset, starts, ends in tables:
+        out += b"\0" * (table_offset - len(out))
+        for offsets in (starts, ends):
+            if sys.byteorder != "little":
+                offsets = array("I", offsets)
+                offsets.byteswap()
+            out += offsets.tobytes()
+    out += meta_bytes
+    out += b"\0" * (payload_offset - len(out))
+    out += packed._buffer
+
+    # 先写临时文件再替换，避免正在映射旧文件的进程读到写了一半的内容
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(out)
+    os.replace(temp_path, path)
+    return len(out)
+
+
+class MmapCorpus(PackedCorpus):
+    """映射二进制文本库：打开时只解析文件头和索引，偏移表和正文都是对映射内存的零拷贝切片"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        """解析文件头、元数据和索引；所有偏移都先检查不越界，格式不对时抛出ValueError
+
+        检查全部通过后才创建偏移表的切片，出错时不会留下引用映射内存的视图
+        """
+        with memoryview(self._mmap) as view:
+            size = len(view)
+            if size < HEADER_FORMAT.size:
+                raise ValueError(f"文本库文件不完整: {self.path}")
+            (magic, version, _, category_count, index_offset, meta_offset, meta_size,
+             payload_offset, payload_size) = HEADER_FORMAT.unpack_from(view)
+            if magic != CORPUS_MAGIC:
+                raise ValueError(f"不是文本库文件: {self.path}")
+            if version != CORPUS_VERSION:
+                raise ValueError(f"文本库版本不匹配: {version}（需要{CORPUS_VERSION}）")
+            if sys.byteorder != "little":
+                raise ValueError("二进制文本库只支持小端序平台")
+            for offset, length in ((index_offset, category_count * INDEX_FORMAT.size),
+                                   (meta_offset, meta_size), (payload_offset, payload_size)):
+                if offset < HEADER_FORMAT.size or offset + length > size:
+                    raise ValueError(f"文本库文件不完整: {self.path}")
+
+            meta = json.loads(bytes(view[meta_offset:meta_offset + meta_size]).decode("utf-8"))
+            categories = meta.pop("categories", None) if isinstance(meta, dict) else None
+            if (not isinstance(categories, list) or len(categories) != category_count
+                    or not all(isinstance(category, str) for category in categories)
+                    or len(set(categories)) != len(categories)
+                    or not all(isinstance(meta.get(key, {}), dict) for key in ("styles", "tones"))):
+                raise ValueError(f"文本库元数据损坏: {self.path}")
+
+            tables = []
+            for position, category in enumerate(categories):
+                count, table_offset = INDEX_FORMAT.unpack_from(view, index_offset + position * INDEX_FORMAT.size)
+                if table_offset < HEADER_FORMAT.size or table_offset + count * 8 > size:
+                    raise ValueError(f"文本库索引损坏: {self.path}")
+                tables.append((category, count * 4, table_offset))
+
+            self.meta = meta
+            self._buffer = view[payload_offset:payload_offset + payload_size]
+            for category, length, table_offset in tables:
+                starts = view[table_offset:table_offset + length].cast("I")
+                ends = view[table_offset + length:table_offset + 2 * length].cast("I")
+                self._tables[category] = (starts, ends)
+
+    def add_category(self, category, lines):
+        raise TypeError("映射的文本库是只读的")
+
+    def loaded_categories(self):
+        """映射后所有类别都可直接访问"""
+        return self.categories()
+
+    def load_all(self):
+        return self
+
+    def close(self):
+        """释放映射（之后不能再访问文本）"""
+        for starts, ends in self._tables.values():
+            starts.release()
+            ends.release()
+        self._tables = {}
+        self._ends = {}
+        if isinstance(self._buffer, memoryview):
+            self._buffer.release()
+        self._buffer = bytearray()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def iter_text_lines(path):
+    """逐行流式读取文本文件，产出(字节偏移, 原始字节)，跳过空行和注释行"""
+    with open(path, "rb") as f:
+        offset = 0
+        for raw in f:
+            line = raw.rstrip(b"\r\n")
+            if line.strip() and not line.startswith(b"#"):
+                yield offset, line
+            offset += len(raw)
+
+
+def _uniform_open(rng):
+    """(0, 1)区间的均匀随机数，避免对0取对数"""
+    value = rng.random()
+    while value == 0.0:
+        value = rng.random()
+    return value
+
+
+def reservoir_sample(iterable, count, rng=random):
+    """蓄水池抽样（Algorithm L）：一次遍历不重复地取count项，内存只与count有关"""
+    iterator = iter(iterable)
+    reservoir = list(islice(iterator, count))
+    if count <= 0 or len(reservoir) < count:
+        rng.shuffle(reservoir)
+        return reservoir
+
+    # 用对数保存权重，避免count很大时权重被舍入成1
+    log_weight = math.log(_uniform_open(rng)) / count
+    while True:
+        # 按几何分布直接跳过不会被选中的项，跳过过程由islice在C层完成
+        skip = int(math.log(_uniform_open(rng)) / math.log(-math.expm1(log_weight)))
+        item = next(islice(iterator, skip, None), None)
+        if item is None:
+            break
+        reservoir[rng.randrange(count)] = item
+        log_weight += math.log(_uniform_open(rng)) / count
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+class StreamingCorpus:
+    """流式文本包：目录格式与texts相同，文本从不整体载入内存
+
+    有磁盘偏移索引（<类别>.idx，首次访问时流式构建）时随机读取指定行；
+    索引无法写入时退回蓄水池抽样，每次抽样流式扫描一遍文件。
+    """
+
+    def __init__(self, directory, use_index=True):
+        self.directory = directory
+        self.use_index = use_index
+        self.meta = {}
+        self._manifest = read_text_file(os.path.join(directory, MANIFEST_FILE))
+        self._known = set(self._manifest)
+        self._indexes = {}  # 类别 -> (索引文件, 文本文件, 条数)；None表示没有可用索引
+        self._counts = {}   # 无索引时缓存的条数
+        self._last_raw = (None, b"")  # 最近读取的一条：((类别, 下标), 原始字节)
+
+    def _path(self, category):
+        if category not in self._known:
+            raise KeyError(category)
+        return os.path.join(self.directory, f"{category}.txt")
+
+    def _index(self, category):
+        """打开（必要时先构建）类别的偏移索引，不可用时返回None"""
+        if category in self._indexes:
+            return self._indexes[category]
+        index = None
+        if self.use_index:
+            path = self._path(category)
+            index_path = path + LINE_INDEX_SUFFIX
+            try:
+                if not self._index_is_fresh(path, index_path):
+                    self.build_index(category)
+                index_file = open(index_path, "rb")
+                count = (os.path.getsize(index_path) - LINE_INDEX_HEADER.size) // LINE_INDEX_ENTRY.size
+                index = (index_file, open(path, "rb"), count)
+            except OSError as e:
+                logging.warning(f"文本包索引不可用，改用蓄水池抽样: {e}")
+        self._indexes[category] = index
+        return index
+
+    @staticmethod
+    def _index_is_fresh(path, index_path):
+        """索引文件头记录的源文件大小和修改时间是否与当前一致"""
+        try:
+            with open(index_path, "rb") as f:
+                magic, size, mtime = LINE_INDEX_HEADER.unpack(f.read(LINE_INDEX_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        stat = os.stat(path)
+        return magic == LINE_INDEX_MAGIC and size == stat.st_size and mtime == stat.st_mtime_ns
+
+    def build_index(self, category):
+        """流式扫描文本文件写出偏移索引，返回文本条数"""
+        path = self._path(category)
+        index_path = path + LINE_INDEX_SUFFIX
+        stat = os.stat(path)
+        count = 0
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(LINE_INDEX_HEADER.pack(LINE_INDEX_MAGIC, stat.st_size, stat.st_mtime_ns))
+            # 分块写出，内存只占一个块
+            chunk = array("Q")
+            for offset, _ in iter_text_lines(path):
+                chunk.append(offset)
+                if len(chunk) >= 65536:
+                    count += len(chunk)
+                    self._write_offsets(f, chunk)
+                    chunk = array("Q")
+            count += len(chunk)
+            self._write_offsets(f, chunk)
+        os.replace(temp_path, index_path)
+        return count
+
+    @staticmethod
+    def _write_offsets(f, chunk):
+        if sys.byteorder != "little":
+            chunk.byteswap()
+        chunk.tofile(f)
+
+    def categories(self):
+        """所有类别（按清单顺序）"""
+        return list(self._manifest)
+
+    def __contains__(self, category):
+        return category in self._known
+
+    def count(self, category):
+        """类别中的文本数量（无索引时需要扫描一遍文件）"""
+        index = self._index(category)
+        if index is not None:
+            return index[2]
+        if category not in self._counts:
+            self._counts[category] = sum(1 for _ in iter_text_lines(self._path(category)))
+        return self._counts[category]
+
+    def _raw(self, category, index):
+        """读取类别中第index条文本的原始字节；刚读过的一条直接复用（装饰时先判断结尾再取正文）"""
+        key = (category, index)
+        if self._last_raw[0] == key:
+            return self._last_raw[1]
+        entry = self._index(category)
+        if entry is None:
+            line = next(islice(iter_text_lines(self._path(category)), index, None), None)
+            if line is None:
+                raise IndexError(index)
+            raw = line[1]
+        else:
+            index_file, text_file, count = entry
+            if not 0 <= index < count:
+                raise IndexError(index)
+            index_file.seek(LINE_INDEX_HEADER.size + index * LINE_INDEX_ENTRY.size)
+            offset, = LINE_INDEX_ENTRY.unpack(index_file.read(LINE_INDEX_ENTRY.size))
+            text_file.seek(offset)
+            raw = text_file.readline().rstrip(b"\r\n")
+        self._last_raw = (key, raw)
+        return raw
+
+    def get(self, category, index):
+        """读取类别中的第index条文本"""
+        return str(self._raw(category, index), "utf-8")
+
+    def lines(self, category):
+        """逐条流式读取类别中的全部文本"""
+        for _, line in iter_text_lines(self._path(category)):
+            yield str(line, "utf-8")
+
+    def choice(self, category):
+        """随机取一条文本"""
+        return self.sample(category, 1)[0]
+
+    def sample(self, category, count):
+        """不重复地随机取count条文本（不足count条时全部取出）"""
+        if self._index(category) is not None:
+            total = self.count(category)
+            indexes = random.sample(range(total), min(count, total))
+            return [self.get(category, index) for index in indexes]
+        return [str(line, "utf-8") for _, line in
+                reservoir_sample(iter_text_lines(self._path(category)), count)]
+
+    def ends_with_punctuation(self, category, index):
+        """第index条文本是否已以标点结尾（读取该行后直接比较末尾的UTF-8字节，无需解码）"""
+        return self._raw(category, index).endswith(ENDING_BYTES)
+
+    def nbytes(self):
+        """文本不常驻内存"""
+        return 0
+
+    def loaded_categories(self):
+        """已经打开索引的类别"""
+        return [category for category, index in self._indexes.items() if index is not None]
+
+    def load_all(self):
+        """为全部类别准备好索引"""
+        for category in self._manifest:
+            self._index(category)
+        return self
+
+    def close(self):
+        """关闭打开的索引和文本文件"""
+        for index in self._indexes.values():
+            if index is not None:
+                index[0].close()
+                index[1].close()
+        self._indexes = {}
+
+
+class CorpusLibraryView(Mapping):
+    """以{类别: [文本, ...]}形式只读访问文本库，兼容旧的library字典"""
+
+    def __init__(self, corpus):
+        self._corpus = corpus
+
+    def __getitem__(self, category):
+        if category not in self._corpus:
+            raise KeyError(category)
+        return list(self._corpus.lines(category))
+
+    def __contains__(self, category):
+        return category in self._corpus
+
+    def __iter__(self):
+        return iter(self._corpus.categories())
+
+    def __len__(self):
+        return len(self._corpus.categories())
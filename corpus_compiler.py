@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 文本库编译工具
+把texts目录中的文本库以及风格、语气库编译成可直接mmap映射的二进制文件
+用法: python corpus_compiler.py [-i 文本库目录] [-o 输出文件]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from corpus import COMPILED_FILE, LazyCorpus, MmapCorpus, write_compiled_corpus
+from text_styles import TEXTS_DIR, STYLES, TONES
+
+
+def compile_texts(source_dir, output_path):
+    """编译文本库目录，返回(类别数, 文本条数, 文件字节数)"""
+    texts = LazyCorpus(source_dir).load_all()
+    mapping = {category: list(texts.lines(category)) for category in texts.categories()}
+    size = write_compiled_corpus(output_path, mapping, {"styles": STYLES, "tones": TONES})
+
+    # 重新映射校验一遍，确保编译结果和源文件一致
+    compiled = MmapCorpus(output_path)
+    try:
+        for category, lines in mapping.items():
+            if list(compiled.lines(category)) != lines:
+                raise ValueError(f"编译结果校验失败: {category}")
+    finally:
+        compiled.close()
+    return len(mapping), sum(len(lines) for lines in mapping.values()), size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="编译浮动文字桌宠的文本库")
+    parser.add_argument("-i", "--input", default=TEXTS_DIR, help="文本库目录（默认: texts）")
+    parser.add_argument("-o", "--output", help=f"输出文件（默认: 文本库目录下的{COMPILED_FILE}）")
+    args = parser.parse_args(argv)
+    output = args.output or os.path.join(args.input, COMPILED_FILE)
+
+    start = time.perf_counter()
+    try:
+        categories, lines, size = compile_texts(args.input, output)
+    except (OSError, ValueError) as e:
+        print(f"× 编译失败: {e}")
+        return 1
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✓ 已编译 {categories} 个类别、{lines} 条文本 -> {output}（{size} 字节，{elapsed:.1f} ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
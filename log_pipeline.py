@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 日志流水线
+调用方线程只把日志记录放入有界队列，格式化和写文件由后台线程完成；
+连续重复的同一条消息在放入队列前就合并为一条"重复了N次"的摘要，日志文件按大小轮转
+"""
+
+import queue
+import atexit
+import logging
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+# 默认日志格式
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# 单个日志文件的大小上限和保留的旧文件个数
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# 队列长度上限（写文件跟不上时丢弃新记录，而不是阻塞调用方）
+LOG_QUEUE_SIZE = 10000
+
+# 重复消息最多合并多久（秒）后写出一条摘要
+COLLAPSE_WINDOW = 5.0
+
+# 通知写入线程退出的标记
+_STOP = object()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """只做最少工作的队列处理器
+
+    连续重复的同一条消息在调用方线程就地计数、不进入队列，换了消息或超过合并时间时
+    先放入一条摘要；其余记录合并消息参数后放入队列，队列满时丢弃并计数
+    """
+
+    def __init__(self, log_queue, collapse_window=COLLAPSE_WINDOW):
+        super().__init__(log_queue)
+        self.collapse_window = collapse_window
+        self._last_key = None
+        self._last_record = None
+        self._repeats = 0
+        self._repeat_since = 0.0
+        self.collapsed = 0  # 被合并掉的重复记录
+        self.dropped = 0    # 队列满时丢弃的记录
+
+    def emit(self, record):
+        # 在处理器锁内调用
+        key = (record.name, record.levelno, record.getMessage())
+        if key == self._last_key and not record.exc_info:
+            now = time.monotonic()
+            if not self._repeats:
+                self._repeat_since = now
+            self._repeats += 1
+            self.collapsed += 1
+            if now - self._repeat_since >= self.collapse_window:
+                self._flush_repeats()
+            return
+        self._flush_repeats()
+        self._last_key = key
+        self._last_record = record
+        super().emit(record)
+
+    def prepare(self, record):
+        # 只合并消息参数（避免参数对象之后被修改），时间格式化和异常堆栈留给写入线程
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _flush_repeats(self):
+        """把积累的重复次数作为一条摘要放入队列（之后同一消息重新开始合并）"""
+        if not self._repeats:
+            return
+        record = self._last_record
+        summary = logging.LogRecord(record.name, record.levelno, record.pathname, record.lineno,
+                                    f"{record.getMessage()}（重复了{self._repeats}次）", None, None)
+        self._repeats = 0
+        self.enqueue(summary)
+
+    def flush_repeats(self):
+        """写入线程空闲时调用：重复停止后也能及时写出摘要"""
+        self.acquire()
+        try:
+            self._flush_repeats()
+        finally:
+            self.release()
+
+
+class LogPipeline:
+    """后台日志写入：install后挂在指定logger上，stop时写完队列中剩余的记录"""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE, collapse_window=COLLAPSE_WINDOW):
+        self.queue = queue.Queue(queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue, collapse_window)
+        self.target = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding="utf-8", delay=True)
+        self.target.setFormatter(logging.Formatter(fmt))
+        self.collapse_window = collapse_window
+        self._thread = None
+        self._logger = None
+        self._reported_dropped = 0
+        self.written = 0  # 写入文件的记录（含摘要）
+
+    def install(self, logger=None, level=logging.INFO):
+        """把队列处理器加到logger上（已有的处理器保持不变）并启动写入线程"""
+        logger = logger if logger is not None else logging.getLogger()
+        logger.addHandler(self.handler)
+        logger.setLevel(level)
+        self._logger = logger
+        self.start()
+        return self
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """写出未完成的重复摘要和剩余记录后停止写入线程，并从logger上移除"""
+        if self._logger is not None:
+            self._logger.removeHandler(self.handler)
+            self._logger = None
+        if self._thread is not None:
+            self.handler.flush_repeats()
+            self.queue.put(_STOP)
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.target.close()
+
+    def _run(self):
+        """写入线程：逐条写文件；空闲超过合并时间时让处理器写出积累的重复摘要"""
+        while True:
+            try:
+                record = self.queue.get(timeout=self.collapse_window)
+            except queue.Empty:
+                self.handler.flush_repeats()
+                continue
+            if record is _STOP:
+                self._report_dropped()
+                return
+            self._report_dropped()
+            self._write(record)
+
+    def _write(self, record):
+        try:
+            self.target.handle(record)
+            self.written += 1
+        except Exception:
+            self.target.handleError(record)
+
+    def _report_dropped(self):
+        """队列满时丢弃的记录数有增加时写一条警告"""
+        dropped = self.handler.dropped
+        if dropped > self._reported_dropped:
+            record = logging.LogRecord("log_pipeline", logging.WARNING, __file__, 0,
+                                       f"日志队列已满，丢弃了{dropped - self._reported_dropped}条记录", None, None)
+            self._reported_dropped = dropped
+            self._write(record)
+
+    def get_stats(self):
+        """获取日志统计"""
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "collapsed": self.handler.collapsed,
+            "dropped": self.handler.dropped,
+        }
+
+
+def setup_logging(path, level=logging.INFO, **options):
+    """让根logger经由后台线程写入按大小轮转的日志文件，退出时自动写完
+
+    与logging.basicConfig一样，根logger已有处理器时什么也不做并返回None
+    """
+    if logging.getLogger().handlers:
+        return None
+    pipeline = LogPipeline(path, **options).install(level=level)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -12,16 +12,27 @@ import sys
 import os
 import random
 import time
+import json
 import logging
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+
+# 启动计时起点（在导入PyQt5之前）
+STARTUP_STARTED = time.perf_counter()
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QSystemTrayIcon, QMenu, 
                             QAction, QWidget, QVBoxLayout, QLabel, QDesktopWidget,
                             QSlider, QDialog, QHBoxLayout, QPushButton, QGroupBox,
-                            QFormLayout, QComboBox, QCheckBox, QWidgetAction)
+                            QFormLayout, QComboBox, QCheckBox, QWidgetAction, QTimeEdit)
 from PyQt5.QtCore import (Qt, QTimer, QPoint, QRect, QSize, QPropertyAnimation, 
-                         QEasingCurve, QRectF, pyqtSignal, QObject)
+                         QEasingCurve, QRectF, pyqtSignal, QObject, QSignalBlocker, QTime)
 from PyQt5.QtGui import (QIcon, QFont, QColor, QPainter, QPainterPath, 
-                        QPixmap, QPen, QBrush, QLinearGradient, QCursor)
+                        QPixmap, QPen, QBrush, QLinearGradient, QCursor,
+                        QFontMetrics, QFontInfo, QImage, QRegion)
+from PyQt5.QtNetwork import QLocalServer
 
 # 导入2.0词库适配器
 try:
@@ -50,13 +61,38 @@ except ImportError:
                 
             def get_random_texts(self, count=1, category="general"):
                 return ["我是一个浮动文字桌宠"] * count
+                
+            def get_sampler_state(self):
+                return {}
+                
+            def set_sampler_state(self, state):
+                pass
+
+from category_matcher import CategoryMatcher, CategoryCache
+from window_tracker import create_backend as create_window_backend
+from scheduling import AdaptiveInterval, WakeupCounter, TimingWheel, MessageScheduler
+from message_pipeline import MessagePipeline
+from metrics import METRICS, timed
+from log_pipeline import setup_logging
+
+# 运行指标（默认关闭，在设置或托盘菜单中开启）
+DISPLAY_LATENCY = METRICS.histogram("display_seconds", "每次显示消息的耗时")
+MESSAGES_DISPLAYED = METRICS.counter("messages_displayed_total", "显示的消息条数")
+ACTIVITY_LATENCY = METRICS.histogram("activity_detect_seconds", "前台窗口变化时判断活动类别的耗时")
+CATEGORY_CHANGES = METRICS.counter("category_changes_total", "活动类别变化次数")
+BUBBLE_PAINT_LATENCY = METRICS.histogram("bubble_paint_seconds", "浮动窗口绘制耗时")
+OVERLAY_PAINT_LATENCY = METRICS.histogram("overlay_paint_seconds", "覆盖层绘制耗时")
+SETTINGS_CHANGES = METRICS.counter("settings_changes_total", "设置项修改次数", label_name="field")
+ERRORS = METRICS.counter("errors_total", "捕获的错误次数", label_name="where")
+
+# 指标导出文件和本地套接字名称（Unix上位于临时目录，Windows上为命名管道）
+METRICS_JSON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.json")
+METRICS_PROMETHEUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.prom")
+METRICS_SOCKET_NAME = "floating_text_metrics"
 
-# 设置日志
-logging.basicConfig(
-    filename='error_log.txt',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# 日志文件（在main()中设置：后台线程写入，按大小轮转，连续重复的消息合并）
+LOG_FILE = 'error_log.txt'
+LOG_PIPELINE = None
 
 # 全局变量
 CATEGORIES = ["general", "coding", "browsing", "video", "office", 
@@ -78,73 +114,384 @@ TONES = {
     "whispering": "悄悄话"
 }
 
+# 托盘图标（XPM格式，直接在内存中创建）
+TRAY_ICON_XPM = [
+    "32 32 3 1",
+    "  c None",
+    ". c #000000",
+    "X c #FFFFFF",
+    "                                ",
+    "                                ",
+    "       ................         ",
+    "      ..XXXXXXXXXXXXXX..        ",
+    "     ..XXXXXXXXXXXXXXXX..       ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "    ..XXXXXXXXXXXXXXXXXX..      ",
+    "     ..XXXXXXXXXXXXXXXX..       ",
+    "      ..XXXXXXXXXXXXXX..        ",
+    "       ................         ",
+    "                                ",
+    "                                ",
+    "                                ",
+    "                                ",
+    "                                ",
+]
+
+# 活动类别匹配器（关键词表在category_matcher中维护，启动时编译一次）
+CATEGORY_MATCHER = CategoryMatcher()
+
+# 自适应调度：活动长时间无变化时显示间隔的最大退避倍数
+MAX_DISPLAY_BACKOFF = 4
+
+# 固定2秒轮询时每分钟的唤醒次数，用于对比
+FIXED_POLL_WAKEUPS_PER_MINUTE = 30
+
+# 休息提醒和深夜提醒的间隔（秒），深夜提醒只在这个时段内触发（每天的分钟数）
+REST_REMINDER_INTERVAL = 45 * 60
+LATE_NIGHT_INTERVAL = 30 * 60
+LATE_NIGHT_HOURS = (23 * 60, 5 * 60)
+
+# 各类别两次显示之间的最小间隔（秒）
+CATEGORY_MIN_SPACING = {
+    "rest_reminder": 30 * 60,
+    "late_night_work": 20 * 60,
+}
+
+# 处于这些活动时推迟提醒类消息（不打断游戏和视频）
+BUSY_CATEGORIES = ("gaming", "video")
+
+# 浮动窗口对象池的默认大小
+DEFAULT_BUBBLE_POOL_SIZE = 10
+
+# 同时显示的气泡数量上限，超出时淘汰最早的气泡
+DEFAULT_MAX_LIVE_BUBBLES = 10
+
+# 气泡淡入淡出时长（毫秒）和动画帧率上限
+FADE_DURATION = 300
+ANIMATION_FPS = 30
+
+# 气泡文字边距和自动换行宽度（计算气泡大小使用）
+BUBBLE_MARGIN = 11
+BUBBLE_TEXT_WIDTH = 260
+
+# 气泡尺寸缓存的条目上限
+BUBBLE_METRICS_CACHE_SIZE = 1024
+
+# 启动后多久开始预热字形（毫秒），以及每个空闲片段的时间预算（毫秒）
+GLYPH_WARMUP_DELAY = 3000
+GLYPH_WARMUP_BUDGET = 4
+
+# 字形预热时每个类别最多读取的文本条数
+GLYPH_WARMUP_MAX_LINES = 2000
+
+# 可写数据目录：源码运行时为脚本所在目录；打包后__file__位于只读的临时解包目录，改用exe所在目录
+DATA_DIR = os.path.dirname(os.path.abspath(sys.executable if getattr(sys, "frozen", False) else __file__))
+
+# 洗牌袋抽样状态文件（与设置文件放在一起，重启后接着上次的进度抽取，避免马上重复）
+SAMPLER_STATE_FILE = os.path.join(DATA_DIR, "sampler_state.json")
+
+# 设置文件，以及设置变化后延迟多久写盘（毫秒，期间的多次修改合并为一次写入）
+SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
+SETTINGS_SAVE_DELAY = 1000
+
+
+def write_json_atomic(path, data):
+    """原子地写入JSON文件：先写临时文件再替换，中途崩溃也不会留下半个文件"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class StartupProfiler:
+    """按阶段记录启动耗时（毫秒）"""
+    
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = []
+        self.first_frame = None  # 到第一帧为止的耗时
+        self._last = self.started
+        
+    def mark(self, name):
+        """记录从上一阶段结束到现在的耗时"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+        
+    def total(self):
+        return (self._last - self.started) * 1000
+        
+    def report(self):
+        """各阶段耗时表"""
+        lines = [f"{name:<14}{elapsed:>10.1f} ms" for name, elapsed in self.phases]
+        if self.first_frame is not None:
+            lines.append(f"{'首帧前合计':<14}{self.first_frame:>10.1f} ms")
+        lines.append(f"{'启动总计':<14}{self.total():>10.1f} ms")
+        return "\n".join(lines)
+
+
 # 设置管理器
 class SettingsManager(QObject):
-    settingsChanged = pyqtSignal()
+    """设置管理器：path不为空时启动读取设置文件，修改后延迟合并写盘
+
+    每次修改（或一个batch中的全部修改）只发出一次settingsChanged，
+    参数为变化了的设置项：{名称: (旧值, 新值)}
+    """
+    settingsChanged = pyqtSignal(dict)
     
-    def __init__(self):
+    # 需要保存的设置项
+    PERSISTENT_FIELDS = ("presence_value", "message_count", "edge_adsorption", "mouse_following",
+                         "autostart", "adaptive_scheduling", "bubble_pool_size", "overlay_mode",
+                         "max_live_bubbles", "text_style", "tone", "fixed_position", "position",
+                         "quiet_hours", "quiet_start", "quiet_end", "metrics_enabled", "metrics_socket")
+    
+    def __init__(self, path=None, save_delay=SETTINGS_SAVE_DELAY):
         super().__init__()
+        self.path = path
+        self.writes = 0        # 实际写盘次数
+        self._loading = False
+        self._batch_depth = 0
+        self._pending = {}     # 本次批量修改中变化的设置项 -> 修改前的值
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(save_delay)
+        self.save_timer.timeout.connect(self.save)
+        
         self.presence_value = 70       # 默认70%存在感（0-100）
         self.message_count = 2         # 默认每次显示2条消息
         self.edge_adsorption = True    # 默认启用边缘吸附
         self.mouse_following = False   # 默认不启用鼠标跟随
         self.autostart = False         # 默认不自动启动
+        self.adaptive_scheduling = False  # 默认不启用自适应调度
+        self.bubble_pool_size = DEFAULT_BUBBLE_POOL_SIZE  # 预创建的浮动窗口数量
+        self.overlay_mode = False      # 默认每条消息一个独立窗口
+        self.max_live_bubbles = DEFAULT_MAX_LIVE_BUBBLES  # 同时显示的气泡上限
         self.text_style = "funny"      # 默认搞笑风格
         self.tone = "normal"           # 默认普通语气
         self.fixed_position = False    # 默认不使用固定位置
         self.position = QPoint(100, 100)  # 默认固定位置
-        
+        self.quiet_hours = False       # 默认不启用免打扰时段
+        self.quiet_start = 23 * 60     # 免打扰开始时间（每天的分钟数）
+        self.quiet_end = 7 * 60        # 免打扰结束时间
+        self.metrics_enabled = False   # 默认不记录运行指标
+        self.metrics_socket = False    # 默认不通过本地套接字导出指标
+        
+        if path is not None:
+            self.load()
+        
+    def _set(self, name, value):
+        """修改一个设置项，值没有变化时不做任何事"""
+        old = getattr(self, name)
+        if value == old:
+            return
+        setattr(self, name, value)
+        self._pending.setdefault(name, old)
+        if self._batch_depth == 0:
+            self._commit()
+            
+    @contextmanager
+    def batch(self):
+        """批量修改：期间的所有修改在结束时合并为一次通知和一次写盘（可嵌套）"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit()
+                
+    def _commit(self):
+        """发出变化通知并安排写盘（改了又改回原值的项不算变化）"""
+        pending, self._pending = self._pending, {}
+        diff = {name: (old, getattr(self, name)) for name, old in pending.items() if old != getattr(self, name)}
+        if not diff or self._loading:
+            return
+        self.settingsChanged.emit(diff)
+        self.schedule_save()
+        
+    def schedule_save(self):
+        """安排延迟写盘；已安排时不重新计时，持续修改（如拖动）时也最多每个延迟周期写一次"""
+        if self.path is not None and not self.save_timer.isActive():
+            self.save_timer.start()
+            
+    def to_dict(self):
+        """导出需要保存的设置（可直接JSON序列化）"""
+        data = {name: getattr(self, name) for name in self.PERSISTENT_FIELDS}
+        data["position"] = [self.position.x(), self.position.y()]
+        return data
+        
+    def load(self):
+        """读取设置文件，逐项通过setter校验，无效的项保持默认值"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.error(f"读取设置失败: {e}")
+            return False
+        if not isinstance(data, dict):
+            return False
+            
+        self._loading = True
+        try:
+            with self.batch():
+                self._load_fields(data)
+        finally:
+            self._loading = False
+        return True
+        
+    def _load_fields(self, data):
+        for name in self.PERSISTENT_FIELDS:
+            if name not in data:
+                continue
+            value = data[name]
+            try:
+                if name == "position":
+                    self.set_position(QPoint(int(value[0]), int(value[1])))
+                elif isinstance(getattr(self, name), bool):
+                    # 只接受JSON的true/false，"false"、0之类的值一律忽略
+                    if not isinstance(value, bool):
+                        raise TypeError(name)
+                    getattr(self, f"set_{name}")(value)
+                elif isinstance(getattr(self, name), int):
+                    getattr(self, f"set_{name}")(int(value))
+                else:
+                    getattr(self, f"set_{name}")(value)
+            except (TypeError, ValueError, IndexError):
+                logging.warning(f"忽略无效的设置项: {name}={value!r}")
+        
+    def save(self):
+        """立即写盘"""
+        self.save_timer.stop()
+        if self.path is None:
+            return
+        try:
+            write_json_atomic(self.path, self.to_dict())
+            self.writes += 1
+        except OSError as e:
+            logging.error(f"保存设置失败: {e}")
+            
+    def flush(self):
+        """有尚未写盘的修改时立即写入（退出前调用）"""
+        if self.save_timer.isActive():
+            self.save()
+            
     def set_presence_value(self, value):
         """设置存在感值（0-100）"""
         if 0 <= value <= 100:
-            self.presence_value = value
-            self.settingsChanged.emit()
+            self._set("presence_value", value)
             return True
         return False
         
     def set_message_count(self, count):
         """设置每次显示的消息数量（1-5）"""
         if 1 <= count <= 5:
-            self.message_count = count
-            self.settingsChanged.emit()
+            self._set("message_count", count)
             return True
         return False
         
     def set_edge_adsorption(self, enabled):
-        self.edge_adsorption = enabled
-        self.settingsChanged.emit()
+        self._set("edge_adsorption", enabled)
         
     def set_mouse_following(self, enabled):
-        self.mouse_following = enabled
-        self.settingsChanged.emit()
+        self._set("mouse_following", enabled)
         
     def set_autostart(self, enabled):
-        self.autostart = enabled
-        self.settingsChanged.emit()
+        self._set("autostart", enabled)
+        
+    def set_adaptive_scheduling(self, enabled):
+        """设置是否启用自适应调度（空闲时降低唤醒频率）"""
+        self._set("adaptive_scheduling", enabled)
+        
+    def set_bubble_pool_size(self, size):
+        """设置浮动窗口对象池大小（0-50）"""
+        if 0 <= size <= 50:
+            self._set("bubble_pool_size", size)
+            return True
+        return False
+        
+    def set_max_live_bubbles(self, count):
+        """设置同时显示的气泡数量上限（1-50）"""
+        if 1 <= count <= 50:
+            self._set("max_live_bubbles", count)
+            return True
+        return False
+        
+    def set_overlay_mode(self, enabled):
+        """设置是否使用单层覆盖模式"""
+        self._set("overlay_mode", enabled)
         
     def set_text_style(self, style):
         if style in STYLES:
-            self.text_style = style
-            self.settingsChanged.emit()
+            self._set("text_style", style)
             return True
         return False
         
     def set_tone(self, tone):
         if tone in TONES:
-            self.tone = tone
-            self.settingsChanged.emit()
+            self._set("tone", tone)
             return True
         return False
         
     def set_fixed_position(self, enabled):
         """设置是否使用固定位置"""
-        self.fixed_position = enabled
-        self.settingsChanged.emit()
+        self._set("fixed_position", enabled)
         
     def set_position(self, position):
-        """设置固定位置"""
-        self.position = position
-        self.settingsChanged.emit()
+        """设置固定位置（拖动时每次移动都会调用，写盘会被合并）"""
+        self._set("position", QPoint(position))
+        
+    def set_quiet_hours(self, enabled):
+        """设置是否启用免打扰时段"""
+        self._set("quiet_hours", enabled)
+        
+    def set_quiet_start(self, minute):
+        """设置免打扰开始时间（0-1439分钟）"""
+        if 0 <= minute < 24 * 60:
+            self._set("quiet_start", minute)
+            return True
+        return False
+        
+    def set_quiet_end(self, minute):
+        """设置免打扰结束时间（0-1439分钟）"""
+        if 0 <= minute < 24 * 60:
+            self._set("quiet_end", minute)
+            return True
+        return False
+        
+    def set_metrics_enabled(self, enabled):
+        """设置是否记录运行指标"""
+        self._set("metrics_enabled", enabled)
+        
+    def set_metrics_socket(self, enabled):
+        """设置是否通过本地套接字导出指标"""
+        self._set("metrics_socket", enabled)
+        
+    def get_quiet_window(self):
+        """免打扰时段(开始分钟, 结束分钟)，未启用时返回None"""
+        if not self.quiet_hours or self.quiet_start == self.quiet_end:
+            return None
+        return self.quiet_start, self.quiet_end
         
     def get_interval(self):
         """根据存在感值计算显示间隔（秒）"""
@@ -162,80 +509,459 @@ class SettingsManager(QObject):
         """获取每次显示的消息数量"""
         return self.message_count
 
-# 浮动窗口类
-class FloatingTextWindow(QWidget):
-    rightClicked = pyqtSignal(QPoint)
-    positionChanged = pyqtSignal(QPoint)
+# 气泡背景绘制
+def paint_bubble_background(painter, width, height, bg_style, bg_color):
+    """按样式绘制圆角气泡背景"""
+    painter.setRenderHint(QPainter.Antialiasing)
     
-    def __init__(self, text="", parent=None):
+    # 创建圆角矩形路径
+    path = QPainterPath()
+    rect = QRectF(0, 0, width, height).adjusted(1, 1, -1, -1)
+    
+    # 使用QRectF避免类型错误
+    path.addRoundedRect(rect, 15, 15)
+    
+    # 根据不同样式绘制背景
+    if bg_style == 0:
+        # 纯色背景
+        painter.fillPath(path, bg_color)
+        
+    elif bg_style == 1:
+        # 渐变背景
+        gradient = QLinearGradient(0, 0, width, height)
+        gradient.setColorAt(0, bg_color)
+        gradient.setColorAt(1, bg_color.lighter(130))
+        painter.fillPath(path, gradient)
+        
+    elif bg_style == 2:
+        # 带边框的背景
+        painter.fillPath(path, bg_color)
+        pen = QPen(bg_color.darker(120), 2)
+        painter.setPen(pen)
+        painter.drawPath(path)
+        
+    else:
+        # 双色背景
+        painter.fillPath(path, bg_color)
+        
+        # 绘制顶部装饰条
+        top_rect = QRectF(rect.x(), rect.y(), rect.width(), 20)
+        top_path = QPainterPath()
+        top_path.addRoundedRect(top_rect, 15, 15)
+        
+        # 创建一个与顶部矩形相交的路径
+        intersect_path = QPainterPath()
+        intersect_path.addRect(QRectF(rect.x(), rect.y() + 10, rect.width(), 10))
+        top_path = top_path.united(intersect_path)
+        
+        painter.fillPath(top_path, bg_color.darker(120))
+
+
+# 气泡背景缓存
+class BubbleBackgroundCache:
+    """按(样式, 颜色, 尺寸, 设备像素比)缓存绘制好的气泡背景，LRU淘汰"""
+    
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, bg_style, bg_color, width, height, ratio=1.0):
+        """获取背景图，缓存中没有时绘制一次"""
+        key = (bg_style, bg_color.rgba(), width, height, ratio)
+        pixmap = self._cache.get(key)
+        if pixmap is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return pixmap
+            
+        self.misses += 1
+        pixmap = QPixmap(max(1, round(width * ratio)), max(1, round(height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        try:
+            paint_bubble_background(painter, width, height, bg_style, bg_color)
+        finally:
+            painter.end()
+            
+        self._cache[key] = pixmap
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+        return pixmap
+        
+    def clear(self):
+        self._cache.clear()
+        
+    def get_stats(self):
+        """获取缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._cache),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# 所有气泡共享的背景缓存
+BACKGROUND_CACHE = BubbleBackgroundCache()
+
+
+def random_bubble_appearance():
+    """随机选择气泡的背景样式、颜色和显示时间"""
+    # 随机背景样式
+    bg_style = random.randint(0, 3)
+    bg_color = random.choice([
+        QColor(255, 200, 200, 220),  # 粉红
+        QColor(200, 255, 200, 220),  # 淡绿
+        QColor(200, 200, 255, 220),  # 淡蓝
+        QColor(255, 255, 200, 220),  # 淡黄
+        QColor(255, 200, 255, 220),  # 淡紫
+        QColor(200, 255, 255, 220)   # 淡青
+    ])
+    
+    # 设置显示时间 (3-6秒)
+    display_time = random.randint(3000, 6000)
+    return bg_style, bg_color, display_time
+
+
+# 所有气泡共享的字体（第一次使用时解析一次）
+_BUBBLE_FONT = None
+_BUBBLE_FONT_LOCK = threading.Lock()
+
+
+def bubble_font():
+    """气泡文字字体：首选字体缺失时（如Linux上没有微软雅黑）只做一次回退查找，之后直接使用解析结果"""
+    global _BUBBLE_FONT
+    with _BUBBLE_FONT_LOCK:
+        if _BUBBLE_FONT is None:
+            font = QFont("微软雅黑", 12)
+            font.setBold(True)
+            resolved = QFontInfo(font).family()
+            if resolved and resolved != font.family():
+                logging.info(f"气泡字体回退为: {resolved}")
+                font = QFont(resolved, 12)
+                font.setBold(True)
+            _BUBBLE_FONT = font
+        return _BUBBLE_FONT
+
+
+def measure_bubble_text(metrics, text):
+    """计算气泡大小（按固定换行宽度排版，与浮动窗口的布局保持一致）"""
+    bounds = metrics.boundingRect(QRect(0, 0, BUBBLE_TEXT_WIDTH, 0), Qt.AlignCenter | Qt.TextWordWrap, text)
+    return QSize(max(200, bounds.width() + 2 * BUBBLE_MARGIN),
+                 max(80, bounds.height() + 2 * BUBBLE_MARGIN))
+
+
+class BubbleMetricsCache:
+    """按文本缓存换行后的气泡尺寸，LRU淘汰；可在多个线程中使用（每个线程各自的QFontMetrics）"""
+    
+    def __init__(self, max_size=BUBBLE_METRICS_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def metrics(self):
+        """当前线程的字体度量"""
+        metrics = getattr(self._local, "metrics", None)
+        if metrics is None:
+            metrics = self._local.metrics = QFontMetrics(bubble_font())
+        return metrics
+        
+    def size(self, text):
+        """获取文本对应的气泡尺寸，缓存中没有时排版一次"""
+        with self._lock:
+            size = self._cache.get(text)
+            if size is not None:
+                self.hits += 1
+                self._cache.move_to_end(text)
+                return QSize(size)
+            self.misses += 1
+            
+        size = measure_bubble_text(self.metrics(), text)
+        with self._lock:
+            self._cache[text] = size
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return QSize(size)
+        
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            
+    def get_stats(self):
+        """获取缓存命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# 所有气泡共享的尺寸缓存
+BUBBLE_METRICS = BubbleMetricsCache()
+
+
+def bubble_text_measurer():
+    """计算气泡大小的函数（供后台预生成使用，内部按线程使用各自的字体度量）"""
+    return BUBBLE_METRICS.size
+
+
+class GlyphWarmer(QObject):
+    """启动后利用空闲时间预热文本库中所有字符的字形，首次显示某条文本时无需现场加载字形"""
+    finished = pyqtSignal()
+    
+    def __init__(self, chunks, budget=GLYPH_WARMUP_BUDGET, parent=None):
         super().__init__(parent)
-        self.text = text
-        self.dragging = False
-        self.drag_position = None
-        self.init_ui()
-        self.setup_animation()
-        
-    def init_ui(self):
-        # 设置窗口属性
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAttribute(Qt.WA_ShowWithoutActivating)
-        
-        # 创建标签显示文本
-        self.label = QLabel(self.text)
-        self.label.setAlignment(Qt.AlignCenter)
-        self.label.setWordWrap(True)
+        self.chunks = chunks  # 产出待预热文本片段的迭代器（可以按需从文本库读取）
+        self.budget = budget
+        self.seen = set()
+        self.elapsed = 0.0
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.CoarseTimer)
+        self.timer.setInterval(50)
+        self.timer.timeout.connect(self.step)
+        self.delay_timer = QTimer(self)
+        self.delay_timer.setSingleShot(True)
+        self.delay_timer.timeout.connect(self.timer.start)
+        self._image = QImage(64, 64, QImage.Format_ARGB32_Premultiplied)
+        
+    def start(self, delay=0):
+        self.delay_timer.start(delay)
+        
+    def stop(self):
+        self.delay_timer.stop()
+        self.timer.stop()
+        
+    def step(self):
+        """处理一个空闲片段：在时间预算内收集新字符并绘制一遍"""
+        start = time.perf_counter()
+        deadline = start + self.budget / 1000.0
+        fresh = []
+        try:
+            while time.perf_counter() < deadline:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    self.stop()
+                    break
+                fresh.extend(char for char in set(chunk) - self.seen if not char.isspace())
+                self.seen.update(chunk)
+        except Exception as e:
+            logging.error(f"字形预热错误: {e}")
+            self.stop()
+            
+        if fresh:
+            # 逐个绘制到离屏图像，让字体引擎载入并缓存这些字形（包括回退字体中的字形）
+            painter = QPainter(self._image)
+            try:
+                painter.setFont(bubble_font())
+                for char in fresh:
+                    painter.drawText(8, 40, char)
+            finally:
+                painter.end()
+        self.elapsed += time.perf_counter() - start
+        
+        if not self.timer.isActive():
+            logging.info(f"字形预热完成: {len(self.seen)}个字符，耗时{self.elapsed * 1000:.1f}ms")
+            self.finished.emit()
+
+
+class MetricsSocketServer(QObject):
+    """通过本地套接字导出指标：客户端连上后发送"json"得到JSON，其他内容或不发送则得到Prometheus文本
+
+    例如: socat - UNIX-CONNECT:/tmp/floating_text_metrics
+    """
+    
+    def __init__(self, registry, name=METRICS_SOCKET_NAME, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.name = name
+        self.server = None
+        self.requests = 0
+        
+    def is_listening(self):
+        return self.server is not None
+        
+    def set_listening(self, enabled):
+        """开始或停止监听"""
+        if enabled and self.server is None:
+            server = QLocalServer(self)
+            QLocalServer.removeServer(self.name)  # 清理上次异常退出残留的套接字文件
+            if not server.listen(self.name):
+                logging.error(f"指标套接字监听失败: {server.errorString()}")
+                server.deleteLater()
+                return False
+            server.newConnection.connect(self.on_new_connection)
+            self.server = server
+            logging.info(f"指标套接字: {server.fullServerName()}")
+        elif not enabled and self.server is not None:
+            self.server.close()
+            self.server.deleteLater()
+            self.server = None
+        return True
+        
+    def on_new_connection(self):
+        while self.server is not None and self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.disconnected.connect(socket.deleteLater)
+            # 客户端有请求内容时按请求回复，没有则稍后直接按Prometheus格式回复
+            socket.readyRead.connect(lambda socket=socket: self.reply(socket))
+            QTimer.singleShot(100, lambda socket=socket: self.reply(socket))
+            
+    def reply(self, socket):
+        """回复一次指标后断开（同一连接只回复一次）"""
+        try:
+            if socket.property("replied"):
+                return
+            socket.setProperty("replied", True)
+            request = bytes(socket.readAll()).decode("utf-8", "ignore").strip().lower()
+            text = self.registry.to_json() if request == "json" else self.registry.to_prometheus()
+            socket.write(text.encode("utf-8"))
+            socket.flush()
+            socket.disconnectFromServer()
+            self.requests += 1
+        except RuntimeError:
+            pass  # 客户端已断开，套接字对象已删除
+
+
+# 统一动画驱动
+class AnimationDriver(QObject):
+    """所有气泡共用一个动画时钟：按帧率上限驱动淡入淡出，停留到期由时间轮统一管理"""
+    
+    FADE_IN, HOLD, FADE_OUT = range(3)
+    _instance = None
+    
+    @classmethod
+    def instance(cls):
+        """全局唯一的驱动器（第一次使用时创建）"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
         
-        # 设置字体
-        font = QFont("微软雅黑", 12)
-        font.setBold(True)
-        self.label.setFont(font)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._phases = {}  # 气泡 -> (阶段, 阶段开始时间)
+        self._easing = QEasingCurve(QEasingCurve.InOutQuad)
+        self.wheel = TimingWheel(self.now())
+        self.frames = 0
+        
+        # 帧定时器：只在有气泡淡入或淡出时运行
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.PreciseTimer)
+        self.frame_timer.setInterval(1000 // ANIMATION_FPS)
+        self.frame_timer.timeout.connect(self.on_frame)
+        
+        # 到期定时器：只为最近一个停留到期时间设置一次
+        self.expiry_timer = QTimer(self)
+        self.expiry_timer.setSingleShot(True)
+        self.expiry_timer.setTimerType(Qt.CoarseTimer)
+        self.expiry_timer.timeout.connect(self.on_expiry)
+        
+    @staticmethod
+    def now():
+        return time.monotonic() * 1000
+        
+    def add(self, bubble):
+        """开始淡入"""
+        self.wheel.cancel(bubble)
+        self._phases[bubble] = (self.FADE_IN, self.now())
+        bubble.set_opacity(0.0)
+        self._ensure_frames()
+        
+    def fade_out(self, bubble):
+        """立即开始淡出（停留未结束时也可调用）"""
+        if bubble not in self._phases or self._phases[bubble][0] == self.FADE_OUT:
+            return
+        self.wheel.cancel(bubble)
+        self._phases[bubble] = (self.FADE_OUT, self.now())
+        self._ensure_frames()
+        self._arm_expiry()
+        
+    def remove(self, bubble):
+        """停止驱动该气泡"""
+        if self._phases.pop(bubble, None) is not None:
+            self.wheel.cancel(bubble)
+            self._arm_expiry()
+            
+    def active_count(self):
+        return len(self._phases)
         
-        # 设置布局
-        layout = QVBoxLayout()
-        layout.addWidget(self.label)
-        self.setLayout(layout)
+    def is_running(self):
+        """是否有定时器在运行"""
+        return self.frame_timer.isActive() or self.expiry_timer.isActive()
         
-        # 设置大小
-        self.adjustSize()
-        self.setMinimumWidth(200)
-        self.setMinimumHeight(80)
-        
-        # 随机背景样式
-        self.bg_style = random.randint(0, 3)
-        self.bg_color = random.choice([
-            QColor(255, 200, 200, 220),  # 粉红
-            QColor(200, 255, 200, 220),  # 淡绿
-            QColor(200, 200, 255, 220),  # 淡蓝
-            QColor(255, 255, 200, 220),  # 淡黄
-            QColor(255, 200, 255, 220),  # 淡紫
-            QColor(200, 255, 255, 220)   # 淡青
-        ])
-        
-        # 设置显示时间 (3-6秒)
-        self.display_time = random.randint(3000, 6000)
-        
-    def setup_animation(self):
-        # 创建淡入动画
-        self.fade_in = QPropertyAnimation(self, b"windowOpacity")
-        self.fade_in.setDuration(300)
-        self.fade_in.setStartValue(0.0)
-        self.fade_in.setEndValue(1.0)
-        self.fade_in.setEasingCurve(QEasingCurve.InOutQuad)
-        
-        # 创建淡出动画
-        self.fade_out = QPropertyAnimation(self, b"windowOpacity")
-        self.fade_out.setDuration(300)
-        self.fade_out.setStartValue(1.0)
-        self.fade_out.setEndValue(0.0)
-        self.fade_out.setEasingCurve(QEasingCurve.InOutQuad)
-        self.fade_out.finished.connect(self.close)
-        
-    def set_text(self, text):
-        self.text = text
-        self.label.setText(text)
-        self.adjustSize()
+    def _ensure_frames(self):
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+            
+    def _arm_expiry(self):
+        """按最近的到期时间设置到期定时器，没有时停止"""
+        deadline = self.wheel.next_deadline()
+        if deadline is None:
+            self.expiry_timer.stop()
+            return
+        delay = max(0, int(deadline - self.now()) + 1)
+        self.expiry_timer.start(delay)
+        
+    def on_frame(self):
+        """推进一帧：更新所有淡入淡出中的气泡"""
+        self.frames += 1
+        now = self.now()
+        fading = False
+        finished = []
+        
+        for bubble, (phase, started) in list(self._phases.items()):
+            if phase == self.HOLD:
+                continue
+            progress = min(1.0, (now - started) / FADE_DURATION)
+            value = self._easing.valueForProgress(progress)
+            if phase == self.FADE_IN:
+                bubble.set_opacity(value)
+                if progress >= 1.0:
+                    # 淡入完成，进入停留阶段
+                    self._phases[bubble] = (self.HOLD, now)
+                    self.wheel.schedule(bubble, now + bubble.display_time)
+                    continue
+            else:
+                bubble.set_opacity(1.0 - value)
+                if progress >= 1.0:
+                    finished.append(bubble)
+                    continue
+            fading = True
+            
+        if not fading:
+            self.frame_timer.stop()
+        self._arm_expiry()
         
+        for bubble in finished:
+            self.remove(bubble)
+            bubble.on_fade_out_finished()
+            
+    def on_expiry(self):
+        """停留到期的气泡开始淡出"""
+        for bubble in self.wheel.advance(self.now()):
+            self.fade_out(bubble)
+        self._arm_expiry()
+
+
+# 气泡定位
+class BubblePositionMixin:
+    """气泡定位方法，要求实现width()、height()和move()"""
+    
     def set_random_position(self, edge_adsorption=True):
         """设置随机位置，可选是否启用边缘吸附"""
         screen = QDesktopWidget().availableGeometry()
@@ -281,68 +1007,100 @@ class FloatingTextWindow(QWidget):
             self.move(cursor_pos.x() - self.width() - offset, cursor_pos.y() - self.height() // 2)
         elif direction == "right":
             self.move(cursor_pos.x() + offset, cursor_pos.y() - self.height() // 2)
-            
+
+
+# 浮动窗口类
+class FloatingTextWindow(QWidget, BubblePositionMixin):
+    rightClicked = pyqtSignal(QPoint)
+    positionChanged = pyqtSignal(QPoint)
+    finished = pyqtSignal()  # 淡出结束、窗口已关闭
+    
+    def __init__(self, text="", parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.dragging = False
+        self.drag_position = None
+        self.init_ui()
+        
+    def init_ui(self):
+        # 设置窗口属性
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        
+        # 创建标签显示文本
+        self.label = QLabel(self.text)
+        self.label.setAlignment(Qt.AlignCenter)
+        self.label.setWordWrap(True)
+        
+        # 设置字体
+        self.label.setFont(bubble_font())
+        
+        # 设置布局（边距与计算气泡大小时使用的边距一致，标签按同样的宽度换行）
+        layout = QVBoxLayout()
+        layout.setContentsMargins(BUBBLE_MARGIN, BUBBLE_MARGIN, BUBBLE_MARGIN, BUBBLE_MARGIN)
+        layout.addWidget(self.label)
+        self.setLayout(layout)
+        
+        # 设置大小（由尺寸缓存给出，无需布局计算）
+        self.setMinimumWidth(200)
+        self.setMinimumHeight(80)
+        self.resize(BUBBLE_METRICS.size(self.text))
+        
+        self.randomize_appearance()
+        
+    def randomize_appearance(self):
+        """随机选择背景样式、颜色和显示时间"""
+        self.bg_style, self.bg_color, self.display_time = random_bubble_appearance()
+        
+    def set_text(self, text, size=None):
+        """设置文本，尺寸使用预先测量的结果或尺寸缓存，不再重新布局计算"""
+        self.text = text
+        self.label.setText(text)
+        self.resize(size if size is not None else BUBBLE_METRICS.size(text))
+        
+    def reset(self, text, size=None):
+        """重置窗口以便复用：停止动画、重新随机外观并设置新文本"""
+        AnimationDriver.instance().remove(self)
+        self.dragging = False
+        self.drag_position = None
+        self.setWindowOpacity(0.0)
+        self.randomize_appearance()
+        self.set_text(text, size)
+        
+    def set_opacity(self, value):
+        self.setWindowOpacity(value)
+        
     def show_with_animation(self):
-        """带动画效果显示窗口"""
+        """带动画效果显示窗口（淡入、停留和淡出由统一的动画驱动器完成）"""
+        self.setWindowOpacity(0.0)
         self.show()
-        self.fade_in.start()
-        
-        # 设置定时器在显示一段时间后关闭
-        QTimer.singleShot(self.display_time, self.start_fade_out)
+        AnimationDriver.instance().add(self)
         
     def start_fade_out(self):
         """开始淡出动画"""
-        self.fade_out.start()
+        AnimationDriver.instance().fade_out(self)
         
-    def paintEvent(self, event):
-        """自定义绘制背景"""
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def on_fade_out_finished(self):
+        """淡出结束后关闭窗口"""
+        self.close()
+        self.finished.emit()
         
-        # 创建圆角矩形路径
-        path = QPainterPath()
-        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+    def closeEvent(self, event):
+        """关闭时退出动画驱动"""
+        AnimationDriver.instance().remove(self)
+        super().closeEvent(event)
         
+    @timed(BUBBLE_PAINT_LATENCY)
+    def paintEvent(self, event):
+        """自定义绘制背景（从共享缓存中取出预先绘制好的背景）"""
         try:
-            # 使用QRectF避免类型错误
-            path.addRoundedRect(rect, 15, 15)
-            
-            # 根据不同样式绘制背景
-            if self.bg_style == 0:
-                # 纯色背景
-                painter.fillPath(path, self.bg_color)
-                
-            elif self.bg_style == 1:
-                # 渐变背景
-                gradient = QLinearGradient(0, 0, self.width(), self.height())
-                gradient.setColorAt(0, self.bg_color)
-                gradient.setColorAt(1, self.bg_color.lighter(130))
-                painter.fillPath(path, gradient)
-                
-            elif self.bg_style == 2:
-                # 带边框的背景
-                painter.fillPath(path, self.bg_color)
-                pen = QPen(self.bg_color.darker(120), 2)
-                painter.setPen(pen)
-                painter.drawPath(path)
-                
-            else:
-                # 双色背景
-                painter.fillPath(path, self.bg_color)
-                
-                # 绘制顶部装饰条
-                top_rect = QRectF(rect.x(), rect.y(), rect.width(), 20)
-                top_path = QPainterPath()
-                top_path.addRoundedRect(top_rect, 15, 15)
-                
-                # 创建一个与顶部矩形相交的路径
-                intersect_path = QPainterPath()
-                intersect_path.addRect(QRectF(rect.x(), rect.y() + 10, rect.width(), 10))
-                top_path = top_path.united(intersect_path)
-                
-                painter.fillPath(top_path, self.bg_color.darker(120))
-                
+            painter = QPainter(self)
+            pixmap = BACKGROUND_CACHE.get(self.bg_style, self.bg_color,
+                                          self.width(), self.height(), self.devicePixelRatioF())
+            painter.drawPixmap(0, 0, pixmap)
         except Exception as e:
+            ERRORS.inc(label="paint")
             logging.error(f"绘制错误: {e}")
             
     def mousePressEvent(self, event):
@@ -369,6 +1127,373 @@ class FloatingTextWindow(QWidget):
             self.dragging = False
             event.accept()
 
+
+# 浮动窗口对象池
+class BubblePool:
+    """预先创建浮动窗口，关闭后重置复用，避免每条消息都新建窗口"""
+    
+    def __init__(self, factory, size=DEFAULT_BUBBLE_POOL_SIZE):
+        self.factory = factory  # 创建新窗口的函数
+        self.size = size
+        self._free = []
+        self._generation = 0  # 更换工厂后，旧窗口归还时直接销毁
+        self.created = 0
+        self.reused = 0
+        self.destroyed = 0
+        
+    def prewarm(self, count=None):
+        """预热对象池，提前创建窗口及其原生窗口句柄"""
+        count = self.size if count is None else min(count, self.size)
+        while len(self._free) < count:
+            window = self._create()
+            window.create()
+            self._free.append(window)
+            
+    def _create(self):
+        self.created += 1
+        window = self.factory()
+        window.pool_generation = self._generation
+        return window
+        
+    def acquire(self, text, size=None):
+        """取出一个窗口并设置新文本（size为预先测量的气泡尺寸）"""
+        if self._free:
+            window = self._free.pop()
+            self.reused += 1
+        else:
+            window = self._create()
+        window.reset(text, size)
+        return window
+        
+    def release(self, window):
+        """归还窗口，池已满时销毁"""
+        if window in self._free:
+            return
+        if window.pool_generation == self._generation and len(self._free) < self.size:
+            self._free.append(window)
+        else:
+            self._destroy(window)
+            
+    def _destroy(self, window):
+        """销毁窗口，原生资源在下一轮事件循环释放"""
+        window.destroyed.connect(self._on_destroyed)
+        window.deleteLater()
+        
+    def _on_destroyed(self, *args):
+        self.destroyed += 1
+            
+    def resize(self, size):
+        """调整池大小，多余的空闲窗口被销毁"""
+        self.size = size
+        while len(self._free) > size:
+            self._destroy(self._free.pop())
+            
+    def clear(self):
+        """销毁所有空闲窗口"""
+        while self._free:
+            self._destroy(self._free.pop())
+            
+    def set_factory(self, factory):
+        """更换窗口工厂（例如切换显示模式），旧窗口不再复用"""
+        self.factory = factory
+        self._generation += 1
+        self.clear()
+        
+    def get_stats(self):
+        """获取对象池统计"""
+        return {"size": self.size, "free": len(self._free), "created": self.created,
+                "reused": self.reused, "destroyed": self.destroyed}
+
+
+# 气泡生命周期管理
+class BubbleManager:
+    """限制同时显示的气泡数量，超出上限时淘汰最早的气泡；气泡关闭后归还对象池或销毁"""
+    
+    def __init__(self, pool, max_live=DEFAULT_MAX_LIVE_BUBBLES):
+        self.pool = pool
+        self.max_live = max_live
+        self._live = {}  # 按显示顺序排列，最早的在前
+        self.shown = 0
+        self.evicted = 0
+        
+    @property
+    def live(self):
+        """当前显示中的气泡（最早的在前）"""
+        return list(self._live)
+        
+    def acquire(self, text, size=None):
+        """取出一个气泡用于显示，已达上限时先淘汰最早的气泡"""
+        while self._live and len(self._live) >= self.max_live:
+            self.evict_oldest()
+        bubble = self.pool.acquire(text, size)
+        self._live[bubble] = None
+        self.shown += 1
+        return bubble
+        
+    def evict_oldest(self):
+        """立即关闭最早显示的气泡"""
+        bubble = next(iter(self._live))
+        self.evicted += 1
+        self._close(bubble)
+        
+    def _close(self, bubble):
+        bubble.on_fade_out_finished()
+        # 未显示过的气泡不会发出finished信号，这里兜底
+        if bubble in self._live:
+            self.on_finished(bubble)
+        
+    def on_finished(self, bubble):
+        """气泡关闭后归还对象池"""
+        if bubble not in self._live:
+            return
+        del self._live[bubble]
+        self.pool.release(bubble)
+        
+    def set_max_live(self, max_live):
+        """修改上限，超出的气泡立即淘汰"""
+        self.max_live = max_live
+        while len(self._live) > max_live:
+            self.evict_oldest()
+            
+    def close_all(self):
+        """关闭所有显示中的气泡"""
+        for bubble in list(self._live):
+            self._close(bubble)
+            
+    def get_stats(self):
+        """获取生命周期统计"""
+        stats = self.pool.get_stats()
+        stats.update({"live": len(self._live), "max_live": self.max_live,
+                      "shown": self.shown, "evicted": self.evicted})
+        return stats
+
+
+# 单层覆盖模式：所有气泡绘制在每个屏幕一个的透明覆盖层上
+class OverlayBubble(QObject, BubblePositionMixin):
+    """覆盖层上的一个气泡（不是独立窗口，由BubbleOverlay负责绘制和命中测试）"""
+    rightClicked = pyqtSignal(QPoint)
+    positionChanged = pyqtSignal(QPoint)
+    finished = pyqtSignal()
+    
+    def __init__(self, overlay):
+        super().__init__(overlay)
+        self.overlay = overlay
+        self.text = ""
+        self.rect = QRect()
+        self.opacity = 0.0
+        self.visible = False
+        self.randomize_appearance()
+        
+    def randomize_appearance(self):
+        """随机选择背景样式、颜色和显示时间"""
+        self.bg_style, self.bg_color, self.display_time = random_bubble_appearance()
+        
+    def create(self):
+        """覆盖层气泡没有原生窗口，预热时无需创建"""
+        
+    def reset(self, text, size=None):
+        """重置气泡以便复用"""
+        AnimationDriver.instance().remove(self)
+        self.opacity = 0.0
+        self.randomize_appearance()
+        self.text = text
+        self.rect.setSize(size if size is not None else self.overlay.measure(text))
+        
+    def width(self):
+        return self.rect.width()
+        
+    def height(self):
+        return self.rect.height()
+        
+    def move(self, *args):
+        """移动到指定的全局坐标"""
+        position = QPoint(*args) if len(args) == 2 else QPoint(args[0])
+        old_rect = QRect(self.rect)
+        self.rect.moveTopLeft(position)
+        if self.visible:
+            self.overlay.bubble_moved(self, old_rect)
+            
+    def set_opacity(self, value):
+        self.opacity = value
+        self.overlay.update_bubble(self)
+        
+    def isVisible(self):
+        return self.visible
+        
+    def show_with_animation(self):
+        """带动画效果显示气泡"""
+        self.visible = True
+        self.overlay.add_bubble(self)
+        AnimationDriver.instance().add(self)
+        
+    def start_fade_out(self):
+        """开始淡出动画"""
+        AnimationDriver.instance().fade_out(self)
+        
+    def on_fade_out_finished(self):
+        self.close()
+        
+    def close(self):
+        """从覆盖层移除"""
+        AnimationDriver.instance().remove(self)
+        if self.visible:
+            self.visible = False
+            self.overlay.remove_bubble(self)
+            self.finished.emit()
+
+
+class OverlaySurface(QWidget):
+    """一个屏幕上的全屏透明覆盖层，只有气泡所在区域接收鼠标事件"""
+    
+    def __init__(self, overlay, screen):
+        super().__init__()
+        self.overlay = overlay
+        self.bubbles = []
+        self.drag_bubble = None
+        self.drag_offset = None
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.set_screen_geometry(screen.geometry())
+        
+    def set_screen_geometry(self, geometry):
+        self.setGeometry(geometry)
+        
+    def local_rect(self, bubble):
+        """气泡在本覆盖层中的坐标"""
+        return bubble.rect.translated(-self.x(), -self.y())
+        
+    def update_mask(self):
+        """只让气泡区域接收鼠标事件，其余区域点击穿透；没有气泡时隐藏"""
+        region = QRegion()
+        for bubble in self.bubbles:
+            region = region.united(QRegion(self.local_rect(bubble)))
+        if region.isEmpty():
+            self.hide()
+            return
+        self.setMask(region)
+        if not self.isVisible():
+            self.show()
+            
+    def bubble_at(self, pos):
+        """命中测试：返回位置处最上层的气泡"""
+        for bubble in reversed(self.bubbles):
+            if self.local_rect(bubble).contains(pos):
+                return bubble
+        return None
+        
+    @timed(OVERLAY_PAINT_LATENCY)
+    def paintEvent(self, event):
+        """绘制本屏幕上的所有气泡"""
+        try:
+            painter = QPainter(self)
+            painter.setFont(self.overlay.font)
+            ratio = self.devicePixelRatioF()
+            for bubble in self.bubbles:
+                rect = self.local_rect(bubble)
+                if not rect.intersects(event.rect()):
+                    continue
+                painter.setOpacity(bubble.opacity)
+                painter.drawPixmap(rect.topLeft(), BACKGROUND_CACHE.get(
+                    bubble.bg_style, bubble.bg_color, rect.width(), rect.height(), ratio))
+                painter.drawText(rect.adjusted(BUBBLE_MARGIN, BUBBLE_MARGIN, -BUBBLE_MARGIN, -BUBBLE_MARGIN),
+                                 Qt.AlignCenter | Qt.TextWordWrap, bubble.text)
+        except Exception as e:
+            ERRORS.inc(label="paint")
+            logging.error(f"绘制错误: {e}")
+            
+    def mousePressEvent(self, event):
+        """鼠标按下事件"""
+        bubble = self.bubble_at(event.pos())
+        if bubble is None:
+            event.ignore()
+            return
+        if event.button() == Qt.LeftButton:
+            self.drag_bubble = bubble
+            self.drag_offset = event.globalPos() - bubble.rect.topLeft()
+        elif event.button() == Qt.RightButton:
+            bubble.rightClicked.emit(event.globalPos())
+        event.accept()
+        
+    def mouseMoveEvent(self, event):
+        """鼠标移动事件"""
+        if event.buttons() == Qt.LeftButton and self.drag_bubble is not None:
+            new_position = event.globalPos() - self.drag_offset
+            self.drag_bubble.move(new_position)
+            self.drag_bubble.positionChanged.emit(new_position)
+            event.accept()
+            
+    def mouseReleaseEvent(self, event):
+        """鼠标释放事件"""
+        if event.button() == Qt.LeftButton and self.drag_bubble is not None:
+            self.overlay.reassign(self.drag_bubble)
+            self.drag_bubble = None
+            event.accept()
+
+
+class BubbleOverlay(QObject):
+    """管理各屏幕的覆盖层：无论显示多少气泡，原生窗口数量都只等于屏幕数量"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = bubble_font()
+        self.surfaces = [OverlaySurface(self, screen) for screen in QApplication.screens()]
+        
+    def measure(self, text):
+        """计算气泡大小（与浮动窗口共用尺寸缓存）"""
+        return BUBBLE_METRICS.size(text)
+        
+    def surface_for(self, bubble):
+        """气泡中心所在屏幕的覆盖层"""
+        center = bubble.rect.center()
+        for surface in self.surfaces:
+            if surface.geometry().contains(center):
+                return surface
+        return self.surfaces[0]
+        
+    def add_bubble(self, bubble):
+        surface = self.surface_for(bubble)
+        surface.bubbles.append(bubble)
+        surface.update_mask()
+        surface.update(surface.local_rect(bubble))
+        
+    def remove_bubble(self, bubble):
+        for surface in self.surfaces:
+            if bubble in surface.bubbles:
+                surface.bubbles.remove(bubble)
+                if surface.drag_bubble is bubble:
+                    surface.drag_bubble = None
+                surface.update(surface.local_rect(bubble))
+                surface.update_mask()
+                
+    def update_bubble(self, bubble):
+        for surface in self.surfaces:
+            if bubble in surface.bubbles:
+                surface.update(surface.local_rect(bubble))
+                
+    def bubble_moved(self, bubble, old_rect):
+        for surface in self.surfaces:
+            if bubble in surface.bubbles:
+                surface.update(old_rect.translated(-surface.x(), -surface.y()))
+                surface.update(surface.local_rect(bubble))
+                surface.update_mask()
+                
+    def reassign(self, bubble):
+        """拖动结束后，气泡移动到了其他屏幕时转移到对应覆盖层"""
+        target = self.surface_for(bubble)
+        if bubble in target.bubbles:
+            return
+        self.remove_bubble(bubble)
+        self.add_bubble(bubble)
+        
+    def close(self):
+        for surface in self.surfaces:
+            surface.bubbles = []
+            surface.close()
+            surface.deleteLater()
+        self.surfaces = []
+
+
 # 设置对话框
 class SettingsDialog(QDialog):
     def __init__(self, settings_manager, parent=None):
@@ -445,6 +1570,11 @@ class SettingsDialog(QDialog):
         self.fixed_position_checkbox.setChecked(self.settings_manager.fixed_position)
         position_layout.addWidget(self.fixed_position_checkbox)
         
+        # 单层覆盖模式
+        self.overlay_mode_checkbox = QCheckBox("单层覆盖模式（所有气泡共用一个透明层）")
+        self.overlay_mode_checkbox.setChecked(self.settings_manager.overlay_mode)
+        position_layout.addWidget(self.overlay_mode_checkbox)
+        
         position_group.setLayout(position_layout)
         main_layout.addWidget(position_group)
         
@@ -490,6 +1620,25 @@ class SettingsDialog(QDialog):
         self.autostart_checkbox.setChecked(self.settings_manager.autostart)
         other_layout.addWidget(self.autostart_checkbox)
         
+        # 自适应调度
+        self.adaptive_scheduling_checkbox = QCheckBox("自适应调度（空闲时降低唤醒频率）")
+        self.adaptive_scheduling_checkbox.setChecked(self.settings_manager.adaptive_scheduling)
+        other_layout.addWidget(self.adaptive_scheduling_checkbox)
+        
+        # 免打扰时段
+        quiet_layout = QHBoxLayout()
+        self.quiet_hours_checkbox = QCheckBox("免打扰时段")
+        self.quiet_hours_checkbox.setChecked(self.settings_manager.quiet_hours)
+        quiet_layout.addWidget(self.quiet_hours_checkbox)
+        self.quiet_start_edit = QTimeEdit(QTime(*divmod(self.settings_manager.quiet_start, 60)))
+        self.quiet_start_edit.setDisplayFormat("HH:mm")
+        quiet_layout.addWidget(self.quiet_start_edit)
+        quiet_layout.addWidget(QLabel("至"))
+        self.quiet_end_edit = QTimeEdit(QTime(*divmod(self.settings_manager.quiet_end, 60)))
+        self.quiet_end_edit.setDisplayFormat("HH:mm")
+        quiet_layout.addWidget(self.quiet_end_edit)
+        other_layout.addLayout(quiet_layout)
+        
         other_group.setLayout(other_layout)
         main_layout.addWidget(other_group)
         
@@ -519,26 +1668,33 @@ class SettingsDialog(QDialog):
         self.message_count_label.setText(f"当前值: {value}条")
         
     def accept(self):
-        # 保存设置
-        self.settings_manager.set_presence_value(self.presence_slider.value())
-        self.settings_manager.set_message_count(self.message_count_slider.value())
-        self.settings_manager.set_edge_adsorption(self.edge_adsorption_checkbox.isChecked())
-        self.settings_manager.set_mouse_following(self.mouse_following_checkbox.isChecked())
-        self.settings_manager.set_fixed_position(self.fixed_position_checkbox.isChecked())
-        self.settings_manager.set_autostart(self.autostart_checkbox.isChecked())
-        
-        # 设置文本风格
-        style_index = self.style_combo.currentIndex()
-        if style_index >= 0:
-            style = self.style_combo.itemData(style_index)
-            self.settings_manager.set_text_style(style)
-            
-        # 设置文本语气
-        tone_index = self.tone_combo.currentIndex()
-        if tone_index >= 0:
-            tone = self.tone_combo.itemData(tone_index)
-            self.settings_manager.set_tone(tone)
+        # 保存设置（合并为一次变更通知）
+        with self.settings_manager.batch():
+            self.settings_manager.set_presence_value(self.presence_slider.value())
+            self.settings_manager.set_message_count(self.message_count_slider.value())
+            self.settings_manager.set_edge_adsorption(self.edge_adsorption_checkbox.isChecked())
+            self.settings_manager.set_mouse_following(self.mouse_following_checkbox.isChecked())
+            self.settings_manager.set_fixed_position(self.fixed_position_checkbox.isChecked())
+            self.settings_manager.set_overlay_mode(self.overlay_mode_checkbox.isChecked())
+            self.settings_manager.set_autostart(self.autostart_checkbox.isChecked())
+            self.settings_manager.set_adaptive_scheduling(self.adaptive_scheduling_checkbox.isChecked())
+            self.settings_manager.set_quiet_hours(self.quiet_hours_checkbox.isChecked())
+            for edit, setter in ((self.quiet_start_edit, self.settings_manager.set_quiet_start),
+                                 (self.quiet_end_edit, self.settings_manager.set_quiet_end)):
+                setter(edit.time().hour() * 60 + edit.time().minute())
             
+            # 设置文本风格
+            style_index = self.style_combo.currentIndex()
+            if style_index >= 0:
+                style = self.style_combo.itemData(style_index)
+                self.settings_manager.set_text_style(style)
+                
+            # 设置文本语气
+            tone_index = self.tone_combo.currentIndex()
+            if tone_index >= 0:
+                tone = self.tone_combo.itemData(tone_index)
+                self.settings_manager.set_tone(tone)
+                
         super().accept()
 
 # 关于对话框
@@ -608,16 +1764,73 @@ class AboutDialog(QDialog):
 
 # 主应用类
 class FloatingTextApp(QMainWindow):
-    def __init__(self):
+    # 首帧之后的启动工作全部完成
+    startupFinished = pyqtSignal()
+    
+    def __init__(self, window_backend=None, profiler=None, data_dir=None):
         super().__init__()
-        self.settings_manager = SettingsManager()
+        self.profiler = profiler if profiler is not None else StartupProfiler()
+        
+        # 设置和抽样状态文件所在目录（默认DATA_DIR，基准测试等场合可指定临时目录）
+        if data_dir is None:
+            self.settings_file, self.sampler_state_file = SETTINGS_FILE, SAMPLER_STATE_FILE
+        else:
+            self.settings_file = os.path.join(data_dir, os.path.basename(SETTINGS_FILE))
+            self.sampler_state_file = os.path.join(data_dir, os.path.basename(SAMPLER_STATE_FILE))
+        self.settings_manager = SettingsManager(self.settings_file)
+        self.profiler.mark("读取设置")
+        
+        # 文本库只打开索引，类别内容在首帧之后由预生成线程载入
         self.text_styles = TextStyles()
-        self.windows = []
+        self.profiler.mark("打开文本库")
         self.current_category = "general"
+        self.category_cache = CategoryCache(CATEGORY_MATCHER)
+        self.window_backend = window_backend  # 未指定时按平台自动选择
+        self.display_backoff = AdaptiveInterval(1.0, max_scale=MAX_DISPLAY_BACKOFF)
+        self.display_wakeups = WakeupCounter()
+        self.activity_since_display = True
+        self.overlay = None  # 单层覆盖模式下才创建
+        self.overlay_mode = self.settings_manager.overlay_mode
+        self.bubble_pool = BubblePool(self.bubble_factory(), self.settings_manager.bubble_pool_size)
+        self.bubble_manager = BubbleManager(self.bubble_pool, self.settings_manager.max_live_bubbles)
         self.init_ui()
+        
+        # 后台预生成消息（文本和气泡尺寸），此后text_styles只通过流水线访问
+        self.message_pipeline = MessagePipeline(self.text_styles, bubble_text_measurer)
+        self.glyph_warmer = GlyphWarmer(self.glyph_chunks(), parent=self)
+        self.metrics_server = MetricsSocketServer(METRICS, parent=self)
+        self.setup_metrics()
+        self.profiler.mark("创建界面")
+        
         self.setup_tray_icon()
+        self.profiler.mark("托盘图标")
         self.setup_timers()
+        self.profiler.mark("定时器")
+        
+        # 其余工作放到第一帧之后
+        QTimer.singleShot(0, self.finish_startup)
+        
+    def finish_startup(self):
+        """首帧之后的启动工作：检测当前活动、预热对象池、启动预生成和字形预热"""
+        self.profiler.mark("等待首帧")
+        self.profiler.first_frame = self.profiler.total()
+        
         self.detect_activity()
+        self.profiler.mark("检测活动")
+        
+        # 预热对象池，第一条消息无需现场创建窗口
+        self.bubble_pool.prewarm()
+        self.profiler.mark("预热对象池")
+        
+        self.load_sampler_state()
+        self.message_pipeline.start()
+        self.profiler.mark("启动预生成")
+        
+        # 利用空闲时间预热整个文本库的字形
+        self.glyph_warmer.start(GLYPH_WARMUP_DELAY)
+        self.metrics_server.set_listening(self.settings_manager.metrics_socket)
+        logging.info(f"启动耗时: 首帧{self.profiler.first_frame:.1f}ms，全部{self.profiler.total():.1f}ms")
+        self.startupFinished.emit()
         
     def init_ui(self):
         self.setWindowTitle("浮动文字桌宠")
@@ -632,68 +1845,34 @@ class FloatingTextApp(QMainWindow):
         # 连接设置变更信号
         self.settings_manager.settingsChanged.connect(self.on_settings_changed)
         
-    def setup_tray_icon(self):
-        """设置系统托盘图标"""
-        # 创建临时XPM图标数据
-        xpm_data = [
-            "32 32 3 1",
-            "  c None",
-            ". c #000000",
-            "X c #FFFFFF",
-            "                                ",
-            "                                ",
-            "       ................        ",
-            "      ..XXXXXXXXXXXXXX..       ",
-            "     ..XXXXXXXXXXXXXXXX..      ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "    ..XXXXXXXXXXXXXXXXXX..     ",
-            "     ..XXXXXXXXXXXXXXXX..      ",
-            "      ..XXXXXXXXXXXXXX..       ",
-            "       ................        ",
-            "                                ",
-            "                                ",
-            "                                ",
-            "                                ",
-            "                                "
+    def setup_metrics(self):
+        """按设置开关指标，并把各模块已有的统计登记为导出时读取的仪表"""
+        METRICS.set_enabled(self.settings_manager.metrics_enabled)
+        
+        # 全局缓存的统计重复登记也只保留一份；本实例的统计在关闭时取消登记
+        METRICS.add_collector("background_cache_", BACKGROUND_CACHE.get_stats)
+        METRICS.add_collector("size_cache_", BUBBLE_METRICS.get_stats)
+        if LOG_PIPELINE is not None:
+            METRICS.add_collector("logging_", LOG_PIPELINE.get_stats)
+        self.metric_collectors = [
+            ("bubbles_", self.get_bubble_stats),
+            ("pipeline_", self.message_pipeline.get_stats),
+            ("activity_cache_", self.get_activity_stats),
+            ("scheduler_", self.get_scheduler_metrics),
         ]
-        
-        # 创建临时XPM文件
-        xpm_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_icon.xpm")
-        try:
-            with open(xpm_file, "w") as f:
-                f.write("/* XPM */\n")
-                f.write("static char *icon[] = {\n")
-                for line in xpm_data:
-                    f.write(f'"{line}",\n')
-                f.write("};\n")
-                
-            # 创建QIcon
-            icon = QIcon(xpm_file)
+        for prefix, collect in self.metric_collectors:
+            METRICS.add_collector(prefix, collect)
             
-            # 如果图标创建失败，尝试使用系统图标
-            if icon.isNull():
-                icon = QApplication.style().standardIcon(QApplication.style().SP_ComputerIcon)
-                
-        except Exception as e:
-            logging.error(f"创建图标失败: {e}")
-            # 使用系统图标作为备选
+    def get_scheduler_metrics(self):
+        """调度器的唤醒次数（供指标导出）"""
+        return {"wakeups": self.scheduler.get_stats()["wakeups"]}
+        
+    def setup_tray_icon(self):
+        """设置系统托盘图标"""
+        # 在内存中创建托盘图标，失败时使用系统图标
+        icon = QIcon(QPixmap(TRAY_ICON_XPM))
+        if icon.isNull():
+            logging.error("创建图标失败，使用系统图标")
             icon = QApplication.style().standardIcon(QApplication.style().SP_ComputerIcon)
             
         # 创建系统托盘图标
@@ -704,10 +1883,57 @@ class FloatingTextApp(QMainWindow):
         # 创建托盘菜单
         self.tray_menu = QMenu()
         
-        # 存在感子菜单
-        self.presence_menu = QMenu("存在感")
+        # 子菜单在第一次展开时才创建内容，启动时只创建空菜单
+        self.presence_slider = None
+        self.message_count_slider = None
+        self.edge_adsorption_action = None
+        self.mouse_following_action = None
+        self.fixed_position_action = None
+        self.presence_menu = self.add_lazy_submenu("存在感", self.build_presence_menu)
+        self.message_count_menu = self.add_lazy_submenu("消息数量", self.build_message_count_menu)
+        self.style_menu = self.add_lazy_submenu("文本风格", self.build_style_menu)
+        self.tone_menu = self.add_lazy_submenu("文本语气", self.build_tone_menu)
+        self.position_menu = self.add_lazy_submenu("位置设置", self.build_position_menu)
+        self.metrics_menu = self.add_lazy_submenu("运行指标", self.build_metrics_menu)
         
-        # 存在感滑块
+        # 其他菜单项
+        self.tray_menu.addSeparator()
+        
+        self.settings_action = QAction("设置", self)
+        self.settings_action.triggered.connect(self.show_settings)
+        self.tray_menu.addAction(self.settings_action)
+        
+        self.about_action = QAction("关于", self)
+        self.about_action.triggered.connect(self.show_about)
+        self.tray_menu.addAction(self.about_action)
+        
+        self.tray_menu.addSeparator()
+        
+        self.exit_action = QAction("退出", self)
+        self.exit_action.triggered.connect(self.close)
+        self.tray_menu.addAction(self.exit_action)
+        
+        # 设置托盘菜单
+        self.tray_icon.setContextMenu(self.tray_menu)
+        self.tray_icon.activated.connect(self.on_tray_icon_activated)
+        
+        # 显示托盘图标
+        self.tray_icon.show()
+        
+    def add_lazy_submenu(self, title, build):
+        """添加一个子菜单，第一次展开时才调用build(menu)创建内容"""
+        menu = QMenu(title, self.tray_menu)
+        
+        def populate():
+            menu.aboutToShow.disconnect(populate)
+            build(menu)
+            
+        menu.aboutToShow.connect(populate)
+        self.tray_menu.addMenu(menu)
+        return menu
+        
+    def build_presence_menu(self, menu):
+        """创建存在感子菜单中的滑块"""
         presence_widget = QWidget()
         presence_layout = QHBoxLayout(presence_widget)
         presence_layout.setContentsMargins(5, 5, 5, 5)
@@ -725,16 +1951,12 @@ class FloatingTextApp(QMainWindow):
         presence_layout.addWidget(QLabel("高"))
         
         # 将小部件添加到QWidgetAction
-        presence_action = QWidgetAction(self.presence_menu)
+        presence_action = QWidgetAction(menu)
         presence_action.setDefaultWidget(presence_widget)
-        self.presence_menu.addAction(presence_action)
-        
-        self.tray_menu.addMenu(self.presence_menu)
+        menu.addAction(presence_action)
         
-        # 消息数量子菜单
-        self.message_count_menu = QMenu("消息数量")
-        
-        # 消息数量滑块
+    def build_message_count_menu(self, menu):
+        """创建消息数量子菜单中的滑块"""
         message_count_widget = QWidget()
         message_count_layout = QHBoxLayout(message_count_widget)
         message_count_layout.setContentsMargins(5, 5, 5, 5)
@@ -752,136 +1974,256 @@ class FloatingTextApp(QMainWindow):
         message_count_layout.addWidget(QLabel("5"))
         
         # 将小部件添加到QWidgetAction
-        message_count_action = QWidgetAction(self.message_count_menu)
+        message_count_action = QWidgetAction(menu)
         message_count_action.setDefaultWidget(message_count_widget)
-        self.message_count_menu.addAction(message_count_action)
-        
-        self.tray_menu.addMenu(self.message_count_menu)
+        menu.addAction(message_count_action)
         
-        # 文本风格子菜单
-        self.style_menu = QMenu("文本风格")
+    def build_style_menu(self, menu):
+        """创建文本风格子菜单中的选项"""
         for style, display_name in STYLES.items():
             action = QAction(display_name, self)
             action.setData(style)
             action.triggered.connect(self.on_style_action_triggered)
             action.setCheckable(True)
             action.setChecked(style == self.settings_manager.text_style)
-            self.style_menu.addAction(action)
-            
-        self.tray_menu.addMenu(self.style_menu)
+            menu.addAction(action)
         
-        # 文本语气子菜单
-        self.tone_menu = QMenu("文本语气")
+    def build_tone_menu(self, menu):
+        """创建文本语气子菜单中的选项"""
         for tone, display_name in TONES.items():
             action = QAction(display_name, self)
             action.setData(tone)
             action.triggered.connect(self.on_tone_action_triggered)
             action.setCheckable(True)
             action.setChecked(tone == self.settings_manager.tone)
-            self.tone_menu.addAction(action)
-            
-        self.tray_menu.addMenu(self.tone_menu)
-        
-        # 位置设置子菜单
-        self.position_menu = QMenu("位置设置")
+            menu.addAction(action)
         
+    def build_position_menu(self, menu):
+        """创建位置设置子菜单中的选项"""
         self.edge_adsorption_action = QAction("边缘吸附", self)
         self.edge_adsorption_action.setCheckable(True)
         self.edge_adsorption_action.setChecked(self.settings_manager.edge_adsorption)
         self.edge_adsorption_action.triggered.connect(self.on_edge_adsorption_action_triggered)
-        self.position_menu.addAction(self.edge_adsorption_action)
+        menu.addAction(self.edge_adsorption_action)
         
         self.mouse_following_action = QAction("鼠标跟随", self)
         self.mouse_following_action.setCheckable(True)
         self.mouse_following_action.setChecked(self.settings_manager.mouse_following)
         self.mouse_following_action.triggered.connect(self.on_mouse_following_action_triggered)
-        self.position_menu.addAction(self.mouse_following_action)
+        menu.addAction(self.mouse_following_action)
         
         self.fixed_position_action = QAction("使用固定位置", self)
         self.fixed_position_action.setCheckable(True)
         self.fixed_position_action.setChecked(self.settings_manager.fixed_position)
         self.fixed_position_action.triggered.connect(self.on_fixed_position_action_triggered)
-        self.position_menu.addAction(self.fixed_position_action)
+        menu.addAction(self.fixed_position_action)
         
         self.reset_position_action = QAction("重置位置", self)
         self.reset_position_action.triggered.connect(self.on_reset_position_action_triggered)
-        self.position_menu.addAction(self.reset_position_action)
-        
-        self.tray_menu.addMenu(self.position_menu)
-        
-        # 其他菜单项
-        self.tray_menu.addSeparator()
-        
-        self.settings_action = QAction("设置", self)
-        self.settings_action.triggered.connect(self.show_settings)
-        self.tray_menu.addAction(self.settings_action)
-        
-        self.about_action = QAction("关于", self)
-        self.about_action.triggered.connect(self.show_about)
-        self.tray_menu.addAction(self.about_action)
-        
-        self.tray_menu.addSeparator()
-        
-        self.exit_action = QAction("退出", self)
-        self.exit_action.triggered.connect(self.close)
-        self.tray_menu.addAction(self.exit_action)
-        
-        # 设置托盘菜单
-        self.tray_icon.setContextMenu(self.tray_menu)
-        self.tray_icon.activated.connect(self.on_tray_icon_activated)
-        
-        # 显示托盘图标
-        self.tray_icon.show()
-        
+        menu.addAction(self.reset_position_action)
+        
+    def build_metrics_menu(self, menu):
+        """创建运行指标子菜单：开关、摘要和导出（摘要在每次展开时刷新）"""
+        self.metrics_enabled_action = QAction("记录指标", self)
+        self.metrics_enabled_action.setCheckable(True)
+        self.metrics_enabled_action.triggered.connect(self.settings_manager.set_metrics_enabled)
+        menu.addAction(self.metrics_enabled_action)
+        
+        self.metrics_socket_action = QAction("本地套接字导出", self)
+        self.metrics_socket_action.setCheckable(True)
+        self.metrics_socket_action.triggered.connect(self.settings_manager.set_metrics_socket)
+        menu.addAction(self.metrics_socket_action)
+        
+        menu.addSeparator()
+        self.metrics_summary_actions = []
+        for _ in range(4):
+            action = menu.addAction("")
+            action.setEnabled(False)
+            self.metrics_summary_actions.append(action)
+        menu.addSeparator()
+        
+        menu.addAction("导出JSON", lambda: self.export_metrics(METRICS_JSON_FILE, "json"))
+        menu.addAction("导出Prometheus", lambda: self.export_metrics(METRICS_PROMETHEUS_FILE, "prometheus"))
+        menu.addAction("清零", METRICS.reset)
+        
+        menu.aboutToShow.connect(self.refresh_metrics_menu)
+        self.refresh_metrics_menu()
+        
+    def refresh_metrics_menu(self):
+        """刷新运行指标子菜单中的开关状态和摘要"""
+        self.metrics_enabled_action.setChecked(self.settings_manager.metrics_enabled)
+        self.metrics_socket_action.setChecked(self.settings_manager.metrics_socket)
+        bubbles = self.get_bubble_stats()
+        lines = [
+            f"显示: {MESSAGES_DISPLAYED.snapshot()}条  P50 {DISPLAY_LATENCY.quantile(0.5) * 1000:.2f}ms"
+            f"  P95 {DISPLAY_LATENCY.quantile(0.95) * 1000:.2f}ms",
+            f"活动检测: {ACTIVITY_LATENCY.count}次  类别变化 {CATEGORY_CHANGES.snapshot()}次",
+            f"绘制: {BUBBLE_PAINT_LATENCY.count + OVERLAY_PAINT_LATENCY.count}次"
+            f"  设置修改 {sum(SETTINGS_CHANGES.values.values())}次",
+            f"气泡: 显示中 {bubbles['live']}  已显示 {bubbles['shown']}  淘汰 {bubbles['evicted']}"
+            f"  复用 {bubbles['reused']}",
+        ]
+        if not METRICS.enabled:
+            lines[0] = "（未记录）" + lines[0]
+        for action, line in zip(self.metrics_summary_actions, lines):
+            action.setText(line)
+            
+    def export_metrics(self, path, fmt):
+        """把指标写入文件"""
+        try:
+            METRICS.dump(path, fmt)
+            logging.info(f"指标已导出: {path}")
+        except OSError as e:
+            logging.error(f"导出指标失败: {e}")
+            
     def setup_timers(self):
         """设置定时器"""
-        # 显示文本的定时器
-        self.display_timer = QTimer(self)
-        self.display_timer.timeout.connect(self.display_random_text)
-        
-        # 启动定时器
-        interval = int(self.settings_manager.get_interval() * 1000)  # 转换为毫秒
-        self.display_timer.start(interval)
-        
-        # 活动检测定时器
-        self.activity_timer = QTimer(self)
-        self.activity_timer.timeout.connect(self.detect_activity)
-        self.activity_timer.start(2000)  # 每2秒检测一次
-        
-    def on_settings_changed(self):
-        """设置变更时的处理"""
-        # 更新文本风格和语气
-        self.text_styles.set_style(self.settings_manager.text_style)
-        self.text_styles.set_tone(self.settings_manager.tone)
+        # 消息调度：所有将来的事件由调度器保存，只为最近的一个设置系统定时器
+        self.scheduler = MessageScheduler(busy=lambda: self.current_category in BUSY_CATEGORIES,
+                                          category_provider=lambda: self.current_category)
+        self.scheduler.set_quiet_hours(self.settings_manager.get_quiet_window())
+        for category, spacing in CATEGORY_MIN_SPACING.items():
+            self.scheduler.set_min_spacing(category, spacing)
+        # 常规消息的间隔已带随机浮动；在游戏、视频中显示的是对应类别的文本，不推迟
+        self.scheduler.add("tick", lambda: self.next_display_interval() / 1000, defer_when_busy=False)
+        self.scheduler.add("rest", REST_REMINDER_INTERVAL, category="rest_reminder", jitter=0.1)
+        self.scheduler.add("late_night", LATE_NIGHT_INTERVAL, category="late_night_work", jitter=0.1,
+                           active_hours=LATE_NIGHT_HOURS)
         
+        self.display_timer = QTimer(self)
+        self.display_timer.setSingleShot(True)
+        self.display_timer.setTimerType(Qt.CoarseTimer)  # 允许系统合并唤醒
+        self.display_timer.timeout.connect(self.on_display_timer)
+        self.arm_display_timer()
+        
+        # 活动检测：优先使用系统窗口事件，不可用时退回每2秒轮询
+        if self.window_backend is None:
+            self.window_backend = create_window_backend(self, poll_interval=2000)
+        self.window_backend.titleChanged.connect(self.on_active_window_changed)
+        self.window_backend.set_adaptive(self.settings_manager.adaptive_scheduling)
+        
+    def next_display_interval(self):
+        """计算下一次显示的间隔（毫秒），自适应模式下活动无变化时逐步退避"""
+        interval = self.settings_manager.get_interval() * 1000  # 转换为毫秒
+        if self.settings_manager.adaptive_scheduling:
+            if self.activity_since_display:
+                self.display_backoff.activity()
+            else:
+                self.display_backoff.idle()
+            interval *= self.display_backoff.scale
+        self.activity_since_display = False
+        return int(interval)
+        
+    def arm_display_timer(self):
+        """按调度器中最近的到期时间设置显示定时器"""
+        deadline = self.scheduler.next_deadline()
+        if deadline is None:
+            self.display_timer.stop()
+            return
+        self.display_timer.start(max(0, int((deadline - time.monotonic()) * 1000)))
+        
+    def reschedule_display(self, delay=None):
+        """常规消息从现在起重新计时（delay为None时按当前存在感计算）"""
+        self.scheduler.reschedule("tick", delay)
+        self.arm_display_timer()
+        
+    def on_display_timer(self):
+        """显示定时器触发：一次唤醒处理所有到期的事件"""
+        self.display_wakeups.tick()
+        try:
+            for name, category in self.scheduler.run_due():
+                if name == "tick":
+                    self.display_random_text()
+                else:
+                    self.display_random_text(category, 1)
+        finally:
+            self.arm_display_timer()
+        
+    def get_wakeup_stats(self):
+        """获取每分钟唤醒次数，与固定2秒轮询对比"""
+        return {
+            "activity_backend": self.window_backend.name,
+            "activity_per_minute": self.window_backend.wakeups.per_minute(),
+            "display_per_minute": self.display_wakeups.per_minute(),
+            "fixed_poll_per_minute": FIXED_POLL_WAKEUPS_PER_MINUTE,
+        }
+        
+    def on_settings_changed(self, diff):
+        """设置变更时的处理：只处理发生变化的设置项"""
+        for field in diff:
+            SETTINGS_CHANGES.inc(label=field)
+            
+        # 开关运行指标和指标套接字
+        if "metrics_enabled" in diff:
+            METRICS.set_enabled(self.settings_manager.metrics_enabled)
+        if "metrics_socket" in diff:
+            self.metrics_server.set_listening(self.settings_manager.metrics_socket)
+            
+        # 更新文本风格和语气（预生成队列中的旧消息作废）
+        if "text_style" in diff or "tone" in diff:
+            self.message_pipeline.configure(style=self.settings_manager.text_style,
+                                            tone=self.settings_manager.tone)
+            
         # 更新定时器间隔
-        interval = int(self.settings_manager.get_interval() * 1000)  # 转换为毫秒
-        self.display_timer.setInterval(interval)
+        if "presence_value" in diff or "adaptive_scheduling" in diff:
+            self.activity_since_display = True
+            self.reschedule_display()
+            self.window_backend.set_adaptive(self.settings_manager.adaptive_scheduling)
+            
+        # 更新免打扰时段
+        if "quiet_hours" in diff or "quiet_start" in diff or "quiet_end" in diff:
+            # 因旧时段推迟的事件会改为立即到期，按新时段重新判断
+            if self.scheduler.set_quiet_hours(self.settings_manager.get_quiet_window()):
+                self.arm_display_timer()
+            
+        # 更新对象池大小
+        if "bubble_pool_size" in diff:
+            self.bubble_pool.resize(self.settings_manager.bubble_pool_size)
+            
+        # 切换显示模式：对象池改为创建另一种气泡
+        if "overlay_mode" in diff:
+            self.overlay_mode = self.settings_manager.overlay_mode
+            self.bubble_pool.set_factory(self.bubble_factory())
+            self.bubble_pool.prewarm()
+            
+        # 更新同时显示的气泡上限
+        if "max_live_bubbles" in diff:
+            self.bubble_manager.set_max_live(self.settings_manager.max_live_bubbles)
         
         # 更新托盘菜单选中状态
-        self.update_tray_menu_checked_state()
+        self.update_tray_menu_checked_state(diff)
         
-    def update_tray_menu_checked_state(self):
-        """更新托盘菜单选中状态"""
-        # 更新文本风格菜单
-        for action in self.style_menu.actions():
-            action.setChecked(action.data() == self.settings_manager.text_style)
+    def update_tray_menu_checked_state(self, diff=None):
+        """更新托盘菜单选中状态（diff为空时全部更新），更新控件时屏蔽其信号，避免再次触发setter"""
+        def changed(name):
+            return diff is None or name in diff
             
+        # 更新文本风格菜单
+        if changed("text_style"):
+            for action in self.style_menu.actions():
+                with QSignalBlocker(action):
+                    action.setChecked(action.data() == self.settings_manager.text_style)
+                    
         # 更新文本语气菜单
-        for action in self.tone_menu.actions():
-            action.setChecked(action.data() == self.settings_manager.tone)
-            
-        # 更新位置设置菜单
-        self.edge_adsorption_action.setChecked(self.settings_manager.edge_adsorption)
-        self.mouse_following_action.setChecked(self.settings_manager.mouse_following)
-        self.fixed_position_action.setChecked(self.settings_manager.fixed_position)
-        
-        # 更新存在感滑块
-        self.presence_slider.setValue(self.settings_manager.presence_value)
-        
-        # 更新消息数量滑块
-        self.message_count_slider.setValue(self.settings_manager.message_count)
-        
+        if changed("tone"):
+            for action in self.tone_menu.actions():
+                with QSignalBlocker(action):
+                    action.setChecked(action.data() == self.settings_manager.tone)
+                    
+        # 更新位置设置菜单、存在感滑块和消息数量滑块（子菜单还没展开过时尚未创建，跳过）
+        for name, widget in (("edge_adsorption", self.edge_adsorption_action),
+                             ("mouse_following", self.mouse_following_action),
+                             ("fixed_position", self.fixed_position_action),
+                             ("presence_value", self.presence_slider),
+                             ("message_count", self.message_count_slider)):
+            if widget is not None and changed(name):
+                with QSignalBlocker(widget):
+                    value = getattr(self.settings_manager, name)
+                    if isinstance(widget, QSlider):
+                        widget.setValue(value)
+                    else:
+                        widget.setChecked(value)
+                    
     def on_presence_slider_changed(self, value):
         """存在感滑块值变化时的处理"""
         self.settings_manager.set_presence_value(value)
@@ -896,6 +2238,8 @@ class FloatingTextApp(QMainWindow):
         if action:
             style = action.data()
             self.settings_manager.set_text_style(style)
+            # 点击已选中的项时设置没有变化、不会发出通知，这里恢复被切换掉的勾选
+            action.setChecked(style == self.settings_manager.text_style)
             
     def on_tone_action_triggered(self):
         """文本语气菜单项触发时的处理"""
@@ -903,6 +2247,8 @@ class FloatingTextApp(QMainWindow):
         if action:
             tone = action.data()
             self.settings_manager.set_tone(tone)
+            # 点击已选中的项时设置没有变化、不会发出通知，这里恢复被切换掉的勾选
+            action.setChecked(tone == self.settings_manager.tone)
             
     def on_edge_adsorption_action_triggered(self, checked):
         """边缘吸附菜单项触发时的处理"""
@@ -929,90 +2275,65 @@ class FloatingTextApp(QMainWindow):
             
     def detect_activity(self):
         """检测当前活动"""
+        self.on_active_window_changed(self.get_active_window_title())
+        
+    @timed(ACTIVITY_LATENCY)
+    def on_active_window_changed(self, active_window_title):
+        """前台窗口变化时重新判断活动类别"""
         try:
-            # 获取当前活跃窗口标题
-            active_window_title = self.get_active_window_title()
-            
             if active_window_title:
-                # 根据窗口标题判断活动类别
-                category = self.determine_category(active_window_title)
+                # 根据窗口标题判断活动类别（标题未变化或命中缓存时不会重新匹配）
+                category = self.category_cache.classify(active_window_title)
+                
+                # 窗口发生变化，下一次显示间隔恢复正常
+                if self.settings_manager.adaptive_scheduling and self.display_backoff.scale > 1:
+                    self.display_backoff.activity()
+                    self.reschedule_display(self.settings_manager.get_interval())
+                self.activity_since_display = True
                 
                 # 如果类别变化，记录新类别
                 if category != self.current_category:
                     logging.info(f"当前活动类别: {category}")
+                    CATEGORY_CHANGES.inc()
                     self.current_category = category
+                    self.message_pipeline.configure(category=category)
         except Exception as e:
+            ERRORS.inc(label="activity")
             logging.error(f"活动检测错误: {e}")
             
+    def get_activity_stats(self):
+        """获取活动检测缓存统计（命中/未命中次数等）"""
+        return self.category_cache.get_stats()
+            
     def get_active_window_title(self):
         """获取当前活跃窗口标题"""
-        try:
-            if sys.platform == "win32":
-                import win32gui
-                window = win32gui.GetForegroundWindow()
-                return win32gui.GetWindowText(window)
-            else:
-                # 其他平台可以添加相应的实现
-                return "未知窗口"
-        except Exception as e:
-            logging.error(f"获取窗口标题错误: {e}")
-            return "未知窗口"
+        return self.window_backend.current_title()
             
     def determine_category(self, window_title):
         """根据窗口标题判断活动类别"""
-        window_title = window_title.lower()
+        return CATEGORY_MATCHER.match(window_title)
         
-        # 编程相关
-        if any(keyword in window_title for keyword in ["vscode", "visual studio", "pycharm", "intellij", "eclipse", "sublime", "notepad++", "vim", "emacs", "atom", "code", "编辑器", "editor", "ide"]):
-            return "coding"
-            
-        # 浏览器相关
-        if any(keyword in window_title for keyword in ["chrome", "firefox", "edge", "safari", "opera", "浏览器", "browser", "internet explorer", "百度", "google", "bing", "搜索", "search"]):
-            return "browsing"
-            
-        # 视频相关
-        if any(keyword in window_title for keyword in ["video", "youtube", "bilibili", "哔哩哔哩", "优酷", "腾讯视频", "爱奇艺", "netflix", "播放器", "player", "movie", "电影", "视频"]):
-            return "video"
-            
-        # 办公相关
-        if any(keyword in window_title for keyword in ["word", "excel", "powerpoint", "office", "文档", "表格", "演示", "document", "spreadsheet", "presentation", "wps", "金山", "pdf"]):
-            return "office"
-            
-        # 游戏相关
-        if any(keyword in window_title for keyword in ["game", "steam", "epic", "origin", "uplay", "battle.net", "游戏", "lol", "dota", "cs", "minecraft", "我的世界"]):
-            return "gaming"
-            
-        # 系统相关
-        if any(keyword in window_title for keyword in ["设置", "控制面板", "任务管理器", "资源管理器", "settings", "control panel", "task manager", "explorer", "system", "系统"]):
-            return "system"
-            
-        # 聊天相关
-        if any(keyword in window_title for keyword in ["微信", "qq", "wechat", "telegram", "whatsapp", "discord", "slack", "teams", "聊天", "chat", "消息", "message"]):
-            return "chat"
-            
-        # 音乐相关
-        if any(keyword in window_title for keyword in ["music", "spotify", "网易云音乐", "qq音乐", "酷狗", "酷我", "apple music", "itunes", "音乐", "播放器", "player"]):
-            return "music"
-            
-        # 阅读相关
-        if any(keyword in window_title for keyword in ["reader", "pdf", "book", "阅读器", "电子书", "kindle", "小说", "novel", "article", "文章"]):
-            return "reading"
-            
-        # 默认类别
-        return "general"
+    def determine_categories(self, window_titles):
+        """批量根据窗口标题判断活动类别"""
+        return CATEGORY_MATCHER.match_many(window_titles)
         
-    def display_random_text(self):
-        """显示随机文本"""
+    @timed(DISPLAY_LATENCY)
+    def display_random_text(self, category=None, count=None):
+        """显示随机文本，默认按当前活动类别和设置的消息数量"""
         try:
             # 获取消息数量
-            count = self.settings_manager.get_message_count()
-            
-            # 获取随机文本
-            texts = self.text_styles.get_random_texts(count, self.current_category)
+            if count is None:
+                count = self.settings_manager.get_message_count()
+                
+            # 取出预生成好的文本和气泡尺寸（队列不够时现场生成）；其他类别（如提醒）现场生成
+            if category is None or category == self.current_category:
+                messages = self.message_pipeline.take(count)
+            else:
+                messages = [self.message_pipeline.generate(category) for _ in range(count)]
             
-            # 显示文本
-            for text in texts:
-                window = FloatingTextWindow(text)
+            # 显示文本（超出同时显示上限时，最早的气泡会被淘汰）
+            for message in messages:
+                window = self.bubble_manager.acquire(message.text, message.size)
                 
                 # 设置位置
                 if self.settings_manager.fixed_position:
@@ -1022,26 +2343,73 @@ class FloatingTextApp(QMainWindow):
                 else:
                     window.set_random_position(self.settings_manager.edge_adsorption)
                     
-                # 连接信号
-                window.rightClicked.connect(self.show_context_menu)
-                window.positionChanged.connect(self.on_window_position_changed)
-                
                 # 显示窗口
                 window.show_with_animation()
                 
-                # 保存窗口引用
-                self.windows.append(window)
-                
-            # 清理已关闭的窗口
-            self.windows = [w for w in self.windows if w.isVisible()]
-            
-            # 更新定时器间隔
-            interval = int(self.settings_manager.get_interval() * 1000)  # 转换为毫秒
-            self.display_timer.setInterval(interval)
+            # 显示完成后再让工作线程补充队列
+            self.message_pipeline.refill()
+            MESSAGES_DISPLAYED.inc(len(messages))
             
         except Exception as e:
+            ERRORS.inc(label="display")
             logging.error(f"显示文本错误: {e}")
             
+    @property
+    def windows(self):
+        """当前显示中的气泡"""
+        return self.bubble_manager.live
+        
+    def get_bubble_stats(self):
+        """获取气泡生命周期统计（显示中、已销毁等）"""
+        return self.bubble_manager.get_stats()
+        
+    def glyph_chunks(self, batch=64, max_lines=GLYPH_WARMUP_MAX_LINES):
+        """逐批产出风格装饰和已载入类别中的文本（供字形预热使用，每批单独加锁）
+
+        只读取已经载入的类别且每个类别最多max_lines条，预热不会触发按需加载或扫描大文件
+        """
+        for style in self.text_styles.styles.values():
+            yield "".join(style["prefix"] + style["suffix"])
+        for tone in self.text_styles.tones.values():
+            yield "".join(tone["punctuation"])
+            
+        corpus = self.text_styles.corpus
+        with self.message_pipeline.lock:
+            categories = corpus.loaded_categories()
+        for category in categories:
+            index = 0
+            while True:
+                with self.message_pipeline.lock:
+                    end = min(index + batch, corpus.count(category), max_lines)
+                    lines = [corpus.get(category, i) for i in range(index, end)]
+                if not lines:
+                    break
+                yield "".join(lines)
+                index = end
+                
+    def bubble_factory(self):
+        """当前显示模式下创建气泡的函数"""
+        if self.overlay_mode:
+            return self.create_overlay_bubble
+        return self.create_bubble_window
+        
+    def connect_bubble(self, bubble):
+        """连接气泡信号"""
+        bubble.rightClicked.connect(self.show_context_menu)
+        bubble.positionChanged.connect(self.on_window_position_changed)
+        bubble.finished.connect(lambda: self.bubble_manager.on_finished(bubble))
+        return bubble
+        
+    def create_bubble_window(self):
+        """创建浮动窗口并连接信号（仅在对象池需要新窗口时调用）"""
+        return self.connect_bubble(FloatingTextWindow())
+        
+    def create_overlay_bubble(self):
+        """创建覆盖层气泡并连接信号"""
+        if self.overlay is None:
+            self.overlay = BubbleOverlay(self)
+        return self.connect_bubble(OverlayBubble(self.overlay))
+        
     def on_window_position_changed(self, position):
         """窗口位置变化时的处理"""
         # 如果启用了固定位置，保存新位置
@@ -1064,34 +2432,88 @@ class FloatingTextApp(QMainWindow):
         dialog = AboutDialog()
         dialog.show_about()
         
+    def load_sampler_state(self):
+        """读取上次保存的洗牌袋状态"""
+        try:
+            with open(self.sampler_state_file, encoding="utf-8") as f:
+                self.text_styles.set_sampler_state(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.error(f"读取抽样状态失败: {e}")
+            
+    def save_sampler_state(self):
+        """保存洗牌袋状态"""
+        try:
+            with self.message_pipeline.lock:
+                state = self.text_styles.get_sampler_state()
+            write_json_atomic(self.sampler_state_file, state)
+        except OSError as e:
+            logging.error(f"保存抽样状态失败: {e}")
+            
     def closeEvent(self, event):
         """关闭事件处理"""
+        # 停止预生成和字形预热，保存抽样进度和尚未写盘的设置
+        self.glyph_warmer.stop()
+        self.metrics_server.set_listening(False)
+        for prefix, collect in self.metric_collectors:
+            METRICS.remove_collector(prefix, collect)
+        self.message_pipeline.stop()
+        self.save_sampler_state()
+        self.settings_manager.flush()
+        
         # 关闭所有窗口
-        for window in self.windows:
-            window.close()
+        self.bubble_manager.close_all()
+        self.bubble_pool.clear()
+        if self.overlay is not None:
+            self.overlay.close()
             
+        # 记录本次运行的活动检测缓存统计
+        logging.info(f"活动检测统计: {self.get_activity_stats()}")
+        logging.info(f"唤醒统计: {self.get_wakeup_stats()}")
+        logging.info(f"背景缓存统计: {BACKGROUND_CACHE.get_stats()}")
+        logging.info(f"尺寸缓存统计: {BUBBLE_METRICS.get_stats()}")
+        logging.info(f"气泡统计: {self.get_bubble_stats()}")
+        logging.info(f"预生成统计: {self.message_pipeline.get_stats()}")
+        logging.info(f"调度统计: {self.scheduler.get_stats()}")
+        if LOG_PIPELINE is not None:
+            logging.info(f"日志统计: {LOG_PIPELINE.get_stats()}")
+        
+        # 停止前台窗口跟踪
+        self.window_backend.stop()
+        
         # 关闭托盘图标
         self.tray_icon.hide()
         
-        # 删除临时图标文件
-        try:
-            xpm_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_icon.xpm")
-            if os.path.exists(xpm_file):
-                os.remove(xpm_file)
-        except:
-            pass
-            
         event.accept()
 
 # 主函数
 def main():
+    global LOG_PIPELINE
+    LOG_PIPELINE = setup_logging(LOG_FILE, level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description="浮动文字桌宠")
+    parser.add_argument("--profile-startup", action="store_true", help="打印启动各阶段耗时后退出")
+    parser.add_argument("--data-dir", help="设置和抽样状态文件所在目录（默认与程序放在一起）")
+    args, qt_args = parser.parse_known_args()
+    
     try:
-        app = QApplication(sys.argv)
+        profiler = StartupProfiler(STARTUP_STARTED)
+        profiler.mark("导入模块")
+        app = QApplication(sys.argv[:1] + qt_args)
         app.setQuitOnLastWindowClosed(False)
+        profiler.mark("创建QApplication")
         
         # 创建并显示应用
-        floating_text_app = FloatingTextApp()
-        
+        floating_text_app = FloatingTextApp(profiler=profiler, data_dir=args.data_dir)
+        
+        if args.profile_startup:
+            def report():
+                print(profiler.report())
+                floating_text_app.close()
+                app.quit()
+            floating_text_app.startupFinished.connect(report)
+            
         # 进入事件循环
         sys.exit(app.exec_())
         
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 消息预生成
+工作线程按当前类别、风格和语气提前抽取并装饰文本、量好气泡尺寸，放入有界队列；
+界面线程每次显示时只需取出即可
+"""
+
+import logging
+import threading
+from collections import deque, namedtuple
+
+# 预生成队列的默认长度
+DEFAULT_PIPELINE_DEPTH = 8
+
+# 预生成好的一条消息：文本、气泡尺寸（没有测量函数时为None）和所属的配置代次
+PreparedMessage = namedtuple("PreparedMessage", ["text", "size", "generation"])
+
+
+class MessagePipeline:
+    """后台消息预生成流水线
+
+    text_styles只能通过流水线访问（内部加锁），类别、风格或语气变化时调用configure，
+    队列中按旧配置生成的消息会被丢弃。measure_factory在使用它的线程中调用一次，
+    返回计算气泡尺寸的函数。
+    """
+
+    def __init__(self, text_styles, measure_factory=None, depth=DEFAULT_PIPELINE_DEPTH):
+        self.text_styles = text_styles
+        self.measure_factory = measure_factory
+        self.depth = depth
+        self.lock = threading.RLock()  # 保护text_styles（抽样状态不是线程安全的）
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._generation = 0
+        self._category = "general"
+        self._style = text_styles.current_style
+        self._tone = text_styles.current_tone
+        self._thread = None
+        self._running = False
+        self._local_measure = None  # 调用方线程上的测量函数（队列不够时现场生成使用）
+
+        # 统计计数
+        self.produced = 0   # 工作线程生成并入队的消息
+        self.served = 0     # 从队列中直接取出的消息
+        self.fallback = 0   # 队列不够、在调用方线程现场生成的消息
+        self.discarded = 0  # 因配置变化被丢弃的消息
+
+    def start(self):
+        """启动工作线程"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="message-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止工作线程并清空队列"""
+        with self._condition:
+            self._running = False
+            self._queue.clear()
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None
+
+    def configure(self, category=None, style=None, tone=None):
+        """更新类别、风格或语气，有变化时作废队列中的消息"""
+        with self._condition:
+            changed = False
+            for name, value in (("_category", category), ("_style", style), ("_tone", tone)):
+                if value is not None and value != getattr(self, name):
+                    setattr(self, name, value)
+                    changed = True
+            if changed:
+                self._generation += 1
+                self.discarded += len(self._queue)
+                self._queue.clear()
+                self._condition.notify_all()
+            return changed
+
+    def take(self, count):
+        """取出count条消息，队列不够时在当前线程现场生成补足
+
+        取出后不会立即唤醒工作线程，以免在界面线程显示气泡时争抢GIL；显示完成后调用refill
+        """
+        with self._condition:
+            messages = []
+            while self._queue and len(messages) < count:
+                messages.append(self._queue.popleft())
+            self.served += len(messages)
+            snapshot = self._snapshot()
+
+        if len(messages) < count:
+            if self._local_measure is None and self.measure_factory is not None:
+                self._local_measure = self.measure_factory()
+            while len(messages) < count:
+                messages.append(self._produce(snapshot, self._local_measure))
+                self.fallback += 1
+        return messages
+
+    def generate(self, category):
+        """在当前线程按当前风格和语气现场生成一条其他类别的消息（不经过队列）"""
+        with self._condition:
+            snapshot = (self._generation, category, self._style, self._tone)
+        if self._local_measure is None and self.measure_factory is not None:
+            self._local_measure = self.measure_factory()
+        return self._produce(snapshot, self._local_measure)
+
+    def refill(self):
+        """唤醒工作线程补满队列"""
+        with self._condition:
+            if len(self._queue) < self.depth:
+                self._condition.notify_all()
+
+    def _snapshot(self):
+        return self._generation, self._category, self._style, self._tone
+
+    def _produce(self, snapshot, measure):
+        """按配置快照生成一条消息"""
+        generation, category, style, tone = snapshot
+        with self.lock:
+            self.text_styles.set_style(style)
+            self.text_styles.set_tone(tone)
+            text = self.text_styles.get_text(category)
+        return PreparedMessage(text, measure(text) if measure is not None else None, generation)
+
+    def _run(self):
+        """工作线程：被唤醒后一口气补满队列，满了就等待下一次refill"""
+        measure = self.measure_factory() if self.measure_factory is not None else None
+        while True:
+            with self._condition:
+                while self._running and len(self._queue) >= self.depth:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                snapshot = self._snapshot()
+
+            try:
+                message = self._produce(snapshot, measure)
+            except Exception as e:
+                logging.error(f"消息预生成错误: {e}")
+                with self._condition:
+                    self._condition.wait(1.0)
+                continue
+
+            with self._condition:
+                if message.generation == self._generation and len(self._queue) < self.depth:
+                    self._queue.append(message)
+                    self.produced += 1
+                else:
+                    self.discarded += 1
+
+    def get_stats(self):
+        """获取预生成统计"""
+        with self._condition:
+            taken = self.served + self.fallback
+            return {
+                "queued": len(self._queue),
+                "produced": self.produced,
+                "served": self.served,
+                "fallback": self.fallback,
+                "discarded": self.discarded,
+                "hit_rate": self.served / taken if taken else 0.0,
+            }
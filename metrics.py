@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 运行指标
+计数器、仪表和延迟直方图的轻量注册表，可导出为JSON或Prometheus文本格式；
+关闭时各记录方法只做一次布尔判断
+"""
+
+import os
+import json
+import time
+import functools
+import threading
+
+# Prometheus指标名前缀
+METRIC_PREFIX = "floating_text_"
+
+# 延迟直方图默认的桶上界（秒）
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _format_labels(label_name, label):
+    return "" if label is None else f'{{{label_name}="{label}"}}'
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """只增不减的计数器，可带一个标签（如设置项名称）"""
+    kind = "counter"
+
+    def __init__(self, registry, name, help_text, label_name=None):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.label_name = label_name
+        self.values = {}  # 标签值（无标签时为None） -> 计数
+
+    def inc(self, amount=1, label=None):
+        if self.registry.enabled:
+            self.values[label] = self.values.get(label, 0) + amount
+
+    def snapshot(self):
+        if self.label_name is None:
+            return self.values.get(None, 0)
+        return dict(self.values)
+
+    def exposition(self, name):
+        values = self.values or {None: 0}
+        return [f"{name}{_format_labels(self.label_name, label)} {_format_value(value)}"
+                for label, value in sorted(values.items(), key=lambda item: str(item[0]))]
+
+
+class Gauge:
+    """可增可减的当前值"""
+    kind = "gauge"
+
+    def __init__(self, registry, name, help_text):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def set(self, value):
+        if self.registry.enabled:
+            self.value = value
+
+    def inc(self, amount=1):
+        if self.registry.enabled:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def snapshot(self):
+        return self.value
+
+    def exposition(self, name):
+        return [f"{name} {_format_value(self.value)}"]
+
+
+class _Timer:
+    """Histogram.time()返回的计时上下文"""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """指标关闭时使用的空计时上下文"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    """延迟直方图（秒），按固定桶累计，另外记录总次数、总耗时和最大值"""
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个桶为+Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        if not self.registry.enabled:
+            return
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def time(self):
+        """计时上下文：with histogram.time(): ..."""
+        return _Timer(self) if self.registry.enabled else _NULL_TIMER
+
+    def quantile(self, q):
+        """按桶估计分位数（取所在桶的上界），没有数据时返回0"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {_format_value(bound): count for bound, count in
+                        zip(self.buckets + (float("inf"),), self.counts)},
+        }
+
+    def exposition(self, name):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum {_format_value(self.sum)}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+def timed(histogram):
+    """装饰器：把函数每次调用的耗时记入直方图（指标关闭时直接调用）"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not histogram.registry.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class MetricsRegistry:
+    """指标注册表：同名指标只创建一次；collector在导出时才调用，用于读取已有的统计"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._collectors = {}  # 前缀 -> collector
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _get(self, cls, name, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args)
+            elif not isinstance(metric, cls):
+                raise TypeError(f"指标{name}已注册为{metric.kind}")
+            return metric
+
+    def counter(self, name, help_text="", label_name=None):
+        return self._get(Counter, name, help_text, label_name)
+
+    def gauge(self, name, help_text=""):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets)
+
+    def add_collector(self, prefix, collect):
+        """登记collector：返回{名称: 数值}的函数（如已有的get_stats），导出时加上前缀作为仪表输出
+
+        同一前缀只保留最后登记的collector
+        """
+        with self._lock:
+            self._collectors[prefix] = collect
+
+    def remove_collector(self, prefix, collect=None):
+        """取消登记；指定collect时只在该前缀仍登记为它时才移除（不影响之后别人重新登记的）"""
+        with self._lock:
+            if collect is None or self._collectors.get(prefix) == collect:
+                self._collectors.pop(prefix, None)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+
+    def reset(self):
+        """清零全部指标"""
+        with self._lock:
+            for metric in self._metrics.values():
+                if isinstance(metric, Histogram):
+                    metric.reset()
+                elif isinstance(metric, Counter):
+                    metric.values.clear()
+                else:
+                    metric.value = 0
+        self.started = time.time()
+
+    def _collected(self):
+        """调用所有collector，出错的跳过"""
+        with self._lock:
+            collectors = list(self._collectors.items())
+        collected = []
+        for prefix, collect in collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    collected.append((prefix + name, value))
+        return collected
+
+    def snapshot(self):
+        """全部指标的当前值（可直接JSON序列化）"""
+        with self._lock:
+            metrics = {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+        for name, value in self._collected():
+            metrics[name] = value
+        return {"enabled": self.enabled, "uptime": time.time() - self.started, "metrics": metrics}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+            for name, metric in metrics:
+                full_name = METRIC_PREFIX + name
+                if metric.help:
+                    lines.append(f"# HELP {full_name} {metric.help}")
+                lines.append(f"# TYPE {full_name} {metric.kind}")
+                lines.extend(metric.exposition(full_name))
+        for name, value in self._collected():
+            full_name = METRIC_PREFIX + name
+            lines.append(f"# TYPE {full_name} gauge")
+            lines.append(f"{full_name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path, fmt="json"):
+        """写入文件（json或prometheus），先写临时文件再替换"""
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        return path
+
+
+# 全局指标注册表（默认关闭，由设置开启）
+METRICS = MetricsRegistry()
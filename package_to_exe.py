@@ -90,6 +90,16 @@ def main():
     if icon_file:
         cmd.extend(["--icon", icon_file])
     
+    # 文本库数据目录需要一起打包，打包前先编译成可直接映射的二进制文件
+    if os.path.isdir("texts"):
+        try:
+            subprocess.run([sys.executable, "corpus_compiler.py"], check=True)
+        except Exception as e:
+            print(f"! 文本库编译失败，程序将改为直接读取文本文件: {e}")
+        cmd.extend(["--add-data", f"texts{os.pathsep}texts"])
+    else:
+        print("! 找不到文本库目录texts，打包后的程序将无法显示文字")
+    
     cmd.append(main_file)
     
     # 执行打包命令
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 调度工具
+自适应退避间隔、唤醒次数统计、时间轮和消息调度器
+"""
+
+import time
+import heapq
+import random
+from collections import deque
+
+# 消息调度器默认的唤醒合并窗口（秒）：一次唤醒顺带处理此后这段时间内到期的事件
+DEFAULT_COALESCE = 2.0
+
+# 用户忙碌时推迟事件的重试间隔（秒）
+DEFAULT_BUSY_RETRY = 60.0
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class AdaptiveInterval:
+    """指数退避的定时间隔：无变化时逐步拉长，有活动时立即恢复"""
+
+    def __init__(self, base, max_scale=16.0, factor=2.0):
+        self.base = base
+        self.max_scale = max_scale
+        self.factor = factor
+        self.scale = 1.0
+        self.stable_ticks = 0
+
+    @property
+    def current(self):
+        """当前间隔"""
+        return self.base * self.scale
+
+    def idle(self):
+        """本轮没有变化，退避一级并返回新间隔"""
+        self.stable_ticks += 1
+        self.scale = min(self.max_scale, self.scale * self.factor)
+        return self.current
+
+    def activity(self):
+        """检测到活动，恢复基础间隔并返回"""
+        self.stable_ticks = 0
+        self.scale = 1.0
+        return self.current
+
+    def set_base(self, base):
+        """修改基础间隔（保留当前退避级别）"""
+        self.base = base
+        return self.current
+
+
+class WakeupCounter:
+    """统计最近一段时间内的唤醒次数"""
+
+    def __init__(self, window=60.0, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.total = 0
+        self._times = deque()
+
+    def tick(self):
+        """记录一次唤醒"""
+        now = self.clock()
+        self.total += 1
+        self._times.append(now)
+        self._trim(now)
+
+    def _trim(self, now):
+        while self._times and now - self._times[0] > self.window:
+            self._times.popleft()
+
+    def per_minute(self):
+        """最近统计窗口内折算的每分钟唤醒次数"""
+        self._trim(self.clock())
+        return len(self._times) * 60.0 / self.window
+
+
+class TimingWheel:
+    """哈希时间轮：O(1)登记和取消，按刻度推进时批量取出到期项"""
+
+    def __init__(self, now, tick=50, slots=256):
+        self.tick = tick
+        self._slots = [dict() for _ in range(slots)]
+        self._entries = {}  # 项 -> (到期时间, 刻度序号)
+        self._current = int(now // tick)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def schedule(self, item, deadline):
+        """登记（或重新登记）一个到期时间"""
+        self.cancel(item)
+        index = max(int(-(-deadline // self.tick)), self._current + 1)
+        self._slots[index % len(self._slots)][item] = deadline
+        self._entries[item] = (deadline, index)
+
+    def cancel(self, item):
+        """取消登记，不存在时忽略"""
+        entry = self._entries.pop(item, None)
+        if entry is not None:
+            del self._slots[entry[1] % len(self._slots)][item]
+
+    def advance(self, now):
+        """推进到当前时间，返回所有已到期的项
+
+        到期时间登记在向上取整的槽中，所以要一直检查到now所在刻度的下一个槽；
+        该槽中未到期的项留待下次推进时再检查
+        """
+        now_index = int(now // self.tick)
+        last_index = int(-(-now // self.tick))
+        steps = min(last_index - self._current, len(self._slots))
+        expired = []
+        for offset in range(1, steps + 1):
+            slot = self._slots[(self._current + offset) % len(self._slots)]
+            for item, deadline in list(slot.items()):
+                # 同一槽中可能有下一圈才到期的项
+                if deadline <= now:
+                    del slot[item]
+                    del self._entries[item]
+                    expired.append(item)
+        self._current = max(self._current, now_index)
+        return expired
+
+    def next_deadline(self):
+        """最近的到期时间，没有登记项时返回None"""
+        if not self._entries:
+            return None
+        return min(deadline for deadline, _ in self._entries.values())
+
+
+def in_daily_window(minute, window):
+    """一天中的第minute分钟是否在时段(开始分钟, 结束分钟)内，支持跨午夜的时段"""
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def seconds_until_minute(now, minute):
+    """从时间戳now（本地时间）到下一次到达一天中第minute分钟的秒数"""
+    local = time.localtime(now)
+    current = local.tm_hour * 60 + local.tm_min + local.tm_sec / 60.0
+    return ((minute - current) % MINUTES_PER_DAY) * 60.0
+
+
+class ScheduledEvent:
+    """调度器中的一个事件
+
+    interval为重复间隔（秒，或返回秒数的函数），为None时只触发一次；
+    category为None时触发时使用调度器当前的类别；active_hours限定只在每天的某个时段内触发。
+    """
+
+    def __init__(self, name, interval, category=None, jitter=0.0, active_hours=None, defer_when_busy=True):
+        self.name = name
+        self.interval = interval
+        self.category = category
+        self.jitter = jitter
+        self.active_hours = active_hours
+        self.defer_when_busy = defer_when_busy
+        self.deadline = None
+        self.seq = 0  # 当前有效的堆条目序号（重新登记后旧条目作废）
+        self.quiet_parked = False  # 是否因免打扰时段被推迟到时段结束
+        self.fired = 0
+        self.deferred = 0
+
+    def next_interval(self, rng):
+        """下一次的间隔（秒），按jitter比例随机浮动"""
+        interval = self.interval() if callable(self.interval) else self.interval
+        if self.jitter:
+            interval *= 1 + rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, interval)
+
+
+class MessageScheduler:
+    """消息调度器：最小堆保存所有将来的事件，调用方只需为最近的到期时间设置一个系统定时器
+
+    每次唤醒调用run_due，合并窗口内到期的事件一起处理；处于免打扰时段、不在事件的活跃时段、
+    用户忙碌或同一类别距上次显示太近的事件会被推迟而不是丢弃。
+    到期时间使用单调时钟（休眠唤醒、校时或夏令时切换不会让事件集中触发或延后），
+    只有活跃时段和免打扰时段按wall_clock给出的本地时间判断。
+    """
+
+    def __init__(self, clock=time.monotonic, rng=random, coalesce=DEFAULT_COALESCE,
+                 busy=None, busy_retry=DEFAULT_BUSY_RETRY, category_provider=None, wall_clock=time.time):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.rng = rng
+        self.coalesce = coalesce
+        self.busy = busy  # 返回用户当前是否忙碌的函数
+        self.busy_retry = busy_retry
+        self.category_provider = category_provider  # 返回当前活动类别的函数
+        self.quiet_hours = None
+        self.min_spacing = {}  # 类别 -> 两次显示的最小间隔（秒）
+        self.last_shown = {}   # 类别 -> 上次显示的时间
+        self._events = {}
+        self._heap = []
+        self._seq = 0
+        self.wakeups = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def __contains__(self, name):
+        return name in self._events
+
+    def add(self, name, interval, category=None, jitter=0.0, active_hours=None, defer_when_busy=True, delay=None):
+        """登记事件（同名事件会被替换），第一次在delay秒后触发，默认按间隔计算"""
+        event = ScheduledEvent(name, interval, category, jitter, active_hours, defer_when_busy)
+        self._events[name] = event
+        self.reschedule(name, delay)
+        return event
+
+    def remove(self, name):
+        """移除事件，不存在时忽略（堆中的旧条目在弹出时跳过）"""
+        self._events.pop(name, None)
+
+    def reschedule(self, name, delay=None):
+        """从现在起重新计时，delay为None时按事件间隔计算"""
+        event = self._events[name]
+        if delay is None:
+            delay = event.next_interval(self.rng)
+        self._push(event, self.clock() + delay)
+
+    def _push(self, event, deadline):
+        self._seq += 1
+        event.seq = self._seq
+        event.deadline = deadline
+        event.quiet_parked = False
+        heapq.heappush(self._heap, (deadline, self._seq, event.name))
+
+    def set_quiet_hours(self, window):
+        """设置免打扰时段(开始分钟, 结束分钟)，None表示关闭
+
+        时段变化时，已因旧时段推迟到其结束时间的事件改为立即到期，由下一次run_due按新时段重新判断；
+        返回这样的事件个数（大于0时调用方应重新设置定时器）
+        """
+        if window == self.quiet_hours:
+            return 0
+        self.quiet_hours = window
+        now = self.clock()
+        parked = [event for event in self._events.values() if event.quiet_parked]
+        for event in parked:
+            self._push(event, now)
+        return len(parked)
+
+    def set_min_spacing(self, category, seconds):
+        """设置某个类别两次显示之间的最小间隔"""
+        if seconds:
+            self.min_spacing[category] = seconds
+        else:
+            self.min_spacing.pop(category, None)
+
+    def _discard_stale(self):
+        """丢弃堆顶已被移除或重新登记的条目"""
+        heap = self._heap
+        while heap:
+            _, seq, name = heap[0]
+            event = self._events.get(name)
+            if event is not None and event.seq == seq:
+                return
+            heapq.heappop(heap)
+
+    def next_deadline(self):
+        """最近的到期时间，没有事件时返回None"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def defer_delay(self, event, category, now, wall=None):
+        """事件现在不能触发时返回需要推迟的秒数，可以触发时返回0（now为单调时钟，wall为时间戳）"""
+        return self._defer(event, category, now, wall)[0]
+
+    def _defer(self, event, category, now, wall=None):
+        """返回(推迟秒数, 是否因免打扰时段推迟)"""
+        wall = self.wall_clock() if wall is None else wall
+        local = time.localtime(wall)
+        minute = local.tm_hour * 60 + local.tm_min
+        if event.active_hours is not None and not in_daily_window(minute, event.active_hours):
+            return seconds_until_minute(wall, event.active_hours[0]), False
+        if self.quiet_hours is not None and in_daily_window(minute, self.quiet_hours):
+            return seconds_until_minute(wall, self.quiet_hours[1]), True
+        if event.defer_when_busy and self.busy is not None and self.busy():
+            return self.busy_retry, False
+        spacing = self.min_spacing.get(category)
+        last = self.last_shown.get(category)
+        if spacing and last is not None and now - last < spacing:
+            return spacing - (now - last), False
+        return 0, False
+
+    def run_due(self, now=None):
+        """处理合并窗口内到期的事件，返回需要显示的[(事件名, 类别)]；重复事件自动登记下一次"""
+        now = self.clock() if now is None else now
+        wall = self.wall_clock()
+        self.wakeups += 1
+        due = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now + self.coalesce:
+                break
+            _, _, name = heapq.heappop(self._heap)
+            due.append(self._events[name])
+
+        fired = []
+        for event in due:
+            category = event.category
+            if category is None and self.category_provider is not None:
+                category = self.category_provider()
+            delay, quiet = self._defer(event, category, now, wall)
+            if delay > 0:
+                event.deferred += 1
+                self._push(event, now + delay)
+                event.quiet_parked = quiet
+                continue
+            event.fired += 1
+            self.last_shown[category] = now
+            fired.append((event.name, category))
+            if event.interval is None:
+                self.remove(event.name)
+            else:
+                self._push(event, now + event.next_interval(self.rng))
+        return fired
+
+    def get_stats(self):
+        """获取各事件的触发和推迟次数"""
+        return {
+            "wakeups": self.wakeups,
+            "events": {name: {"fired": event.fired, "deferred": event.deferred}
+                       for name, event in self._events.items()},
+        }
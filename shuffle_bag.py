@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 洗牌袋抽样
+每个类别一个按种子生成的随机排列加游标：一轮之内不重复，抽完再洗牌，状态小且可序列化
+"""
+
+import random
+from array import array
+
+
+class ShuffleBagSampler:
+    """按类别的洗牌袋抽样器，抽取的是文本下标
+
+    每个类别的状态只有种子、轮次、游标、文本数量和上一轮末尾的少量下标，
+    排列本身由(种子, 轮次)确定地重新生成，不需要保存。
+    """
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self._states = {}        # 类别 -> 状态字典
+        self._permutations = {}  # 类别 -> 当前轮的排列（可由状态重建）
+
+    def _permutation(self, state):
+        """由状态确定地生成本轮排列：上一轮末尾刚抽过的下标放到本轮最后，避免跨轮紧挨着重复"""
+        size = state["size"]
+        order = array("I", range(size))
+        random.Random(f"{state['seed']}-{state['epoch']}").shuffle(order)
+        tail = set(state["tail"])
+        if tail and len(tail) < size:
+            order = array("I", [i for i in order if i not in tail] + [i for i in order if i in tail])
+        return order
+
+    def _state(self, category, size):
+        """获取类别的状态，首次使用或文本数量变化时重新开始"""
+        state = self._states.get(category)
+        if state is None or state["size"] != size:
+            state = {"seed": self.rng.getrandbits(32), "epoch": 0, "cursor": 0, "size": size, "tail": []}
+            self._states[category] = state
+            self._permutations.pop(category, None)
+        order = self._permutations.get(category)
+        if order is None:
+            order = self._permutations[category] = self._permutation(state)
+        return state, order
+
+    def _reshuffle(self, category, state, tail):
+        """开始新的一轮"""
+        state["epoch"] += 1
+        state["cursor"] = 0
+        state["tail"] = tail
+        order = self._permutations[category] = self._permutation(state)
+        return order
+
+    def draw(self, category, size):
+        """抽取一个下标（size为类别中的文本数量）"""
+        state = self._states.get(category)
+        order = self._permutations.get(category)
+        if state is None or order is None or state["size"] != size or state["cursor"] >= size:
+            return self.draw_many(category, size, 1)[0]
+        # 快速路径：本轮还没抽完
+        index = order[state["cursor"]]
+        state["cursor"] += 1
+        return index
+
+    def draw_many(self, category, size, count):
+        """一次抽取count个互不相同的下标（不超过size个），均摊O(1)"""
+        if size <= 0:
+            raise ValueError(f"类别中没有文本: {category}")
+        count = min(count, size)
+        state, order = self._state(category, size)
+        result = []
+        while len(result) < count:
+            if state["cursor"] >= size:
+                # 本次已抽到的（至少上一次抽到的）下标放到新一轮末尾
+                tail = result if result else [order[-1]]
+                order = self._reshuffle(category, state, list(tail))
+            take = min(count - len(result), size - state["cursor"])
+            result.extend(order[state["cursor"]:state["cursor"] + take])
+            state["cursor"] += take
+        return result
+
+    def get_state(self):
+        """导出全部类别的状态（可直接JSON序列化）"""
+        return {category: dict(state, tail=list(state["tail"])) for category, state in self._states.items()}
+
+    def set_state(self, states):
+        """恢复导出的状态，格式不对的类别忽略"""
+        self._states = {}
+        self._permutations = {}
+        for category, state in (states or {}).items():
+            try:
+                size = int(state["size"])
+                restored = {"seed": int(state["seed"]), "epoch": int(state["epoch"]),
+                            "cursor": min(max(int(state["cursor"]), 0), size), "size": size,
+                            "tail": [int(i) for i in state.get("tail", []) if 0 <= int(i) < size]}
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._states[category] = restored
+
+    def reset(self, category=None):
+        """重新开始某个类别（默认全部）"""
+        if category is None:
+            self._states.clear()
+            self._permutations.clear()
+        else:
+            self._states.pop(category, None)
+            self._permutations.pop(category, None)
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+浮动文字桌宠 - 前台窗口跟踪
+可插拔的活动窗口后端：前台窗口或其标题变化时推送事件，轮询仅作为备选方案
+"""
+
+import os
+import sys
+import logging
+
+from PyQt5.QtCore import Qt, QObject, QTimer, QSocketNotifier, pyqtSignal
+
+from scheduling import AdaptiveInterval, WakeupCounter
+
+UNKNOWN_WINDOW_TITLE = "未知窗口"
+
+# 轮询备选方案的默认间隔（毫秒）
+DEFAULT_POLL_INTERVAL = 2000
+
+# 自适应模式下轮询间隔的最大退避倍数（2秒 -> 最长32秒）
+MAX_POLL_BACKOFF = 16
+
+
+def read_active_window_title():
+    """直接读取当前活跃窗口标题（轮询方式使用）"""
+    try:
+        if sys.platform == "win32":
+            import win32gui
+            window = win32gui.GetForegroundWindow()
+            return win32gui.GetWindowText(window)
+        else:
+            # 其他平台可以添加相应的实现
+            return UNKNOWN_WINDOW_TITLE
+    except Exception as e:
+        logging.error(f"获取窗口标题错误: {e}")
+        return UNKNOWN_WINDOW_TITLE
+
+
+class ActiveWindowBackend(QObject):
+    """活动窗口后端基类，标题变化时发出titleChanged信号"""
+    titleChanged = pyqtSignal(str)
+
+    # 是否由系统事件驱动（False表示需要定时轮询）
+    event_driven = False
+    name = "base"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._title = None
+        self.wakeups = WakeupCounter()
+
+    def start(self):
+        """开始跟踪，成功返回True"""
+        return True
+
+    def stop(self):
+        """停止跟踪"""
+
+    def set_adaptive(self, enabled):
+        """开启或关闭自适应退避（事件驱动后端无需轮询，忽略）"""
+
+    def current_title(self):
+        """获取最近一次已知的窗口标题"""
+        return self._title
+
+    def _publish(self, title):
+        """只有标题真正变化时才发出信号"""
+        if title is None or title == self._title:
+            return
+        self._title = title
+        self.titleChanged.emit(title)
+
+
+class PollingBackend(ActiveWindowBackend):
+    """定时轮询后端（没有可用事件源时的备选方案）"""
+    name = "poll"
+
+    def __init__(self, title_func=read_active_window_title,
+                 interval=DEFAULT_POLL_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.title_func = title_func
+        self.adaptive = False
+        self.backoff = AdaptiveInterval(interval, max_scale=MAX_POLL_BACKOFF)
+        self.timer = QTimer(self)
+        # 秒级精度即可，允许系统合并唤醒
+        self.timer.setTimerType(Qt.VeryCoarseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        self._title = self.title_func()
+        self.timer.start()
+        return True
+
+    def stop(self):
+        self.timer.stop()
+
+    def set_adaptive(self, enabled):
+        self.adaptive = enabled
+        if not enabled:
+            self.timer.setInterval(int(self.backoff.activity()))
+
+    def poll(self):
+        """读取一次当前标题"""
+        self.wakeups.tick()
+        previous = self._title
+        self._publish(self.title_func())
+
+        # 自适应模式：标题不变时逐步拉长轮询间隔，变化时立即恢复
+        if self.adaptive:
+            if self._title == previous:
+                interval = self.backoff.idle()
+            else:
+                interval = self.backoff.activity()
+            self.timer.setInterval(int(interval))
+
+
+class Win32Backend(ActiveWindowBackend):
+    """Windows后端：通过SetWinEventHook监听前台窗口切换和标题变化"""
+    event_driven = True
+    name = "win32"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hooks = []
+        self._callback = None
+
+    def start(self):
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            self._user32 = ctypes.windll.user32
+            proc_type = ctypes.WINFUNCTYPE(
+                None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+            # 回调必须保持引用，否则会被垃圾回收
+            self._callback = proc_type(self._on_win_event)
+
+            for event in (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_OBJECT_NAMECHANGE):
+                hook = self._user32.SetWinEventHook(
+                    event, event, 0, self._callback, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+                if not hook:
+                    raise OSError(f"SetWinEventHook失败: {event:#x}")
+                self._hooks.append(hook)
+        except Exception as e:
+            logging.error(f"Win32窗口事件监听不可用: {e}")
+            self.stop()
+            return False
+
+        self._title = self._read_title(self._user32.GetForegroundWindow())
+        return True
+
+    def stop(self):
+        for hook in self._hooks:
+            self._user32.UnhookWinEvent(hook)
+        self._hooks = []
+
+    def _read_title(self, hwnd):
+        """读取窗口标题"""
+        import ctypes
+        length = self._user32.GetWindowTextLengthW(hwnd)
+        buffer = ctypes.create_unicode_buffer(length + 1)
+        self._user32.GetWindowTextW(hwnd, buffer, length + 1)
+        return buffer.value
+
+    def _on_win_event(self, hook, event, hwnd, id_object, id_child, thread, event_time):
+        """系统窗口事件回调（在Qt事件循环所在线程中执行）"""
+        self.wakeups.tick()
+        try:
+            if event == self.EVENT_OBJECT_NAMECHANGE:
+                # 只关心前台窗口本身的标题变化
+                if id_object != self.OBJID_WINDOW or hwnd != self._user32.GetForegroundWindow():
+                    return
+            self._publish(self._read_title(hwnd))
+        except Exception as e:
+            logging.error(f"处理窗口事件错误: {e}")
+
+
+class X11Backend(ActiveWindowBackend):
+    """X11后端：监听根窗口_NET_ACTIVE_WINDOW和活动窗口_NET_WM_NAME的PropertyNotify"""
+    event_driven = True
+    name = "x11"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._display = None
+        self._notifier = None
+        self._active = None
+
+    def start(self):
+        try:
+            from Xlib import X, display
+
+            self._X = X
+            self._display = display.Display()
+            self._root = self._display.screen().root
+            self._NET_ACTIVE_WINDOW = self._display.intern_atom("_NET_ACTIVE_WINDOW")
+            self._NET_WM_NAME = self._display.intern_atom("_NET_WM_NAME")
+            self._WM_NAME = self._display.intern_atom("WM_NAME")
+            self._UTF8_STRING = self._display.intern_atom("UTF8_STRING")
+
+            self._root.change_attributes(event_mask=X.PropertyChangeMask)
+            self._watch_active_window(publish=False)
+        except Exception as e:
+            logging.error(f"X11窗口事件监听不可用: {e}")
+            self.stop()
+            return False
+
+        # X连接可读时才处理事件，空闲时不会唤醒进程
+        self._notifier = QSocketNotifier(self._display.fileno(), QSocketNotifier.Read, self)
+        self._notifier.activated.connect(self._process_events)
+        return True
+
+    def stop(self):
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+            self._notifier = None
+        if self._display is not None:
+            try:
+                self._display.close()
+            except Exception:
+                pass
+            self._display = None
+
+    def _active_window(self):
+        """获取当前活动窗口"""
+        prop = self._root.get_full_property(self._NET_ACTIVE_WINDOW, self._X.AnyPropertyType)
+        if not prop or not prop.value or not prop.value[0]:
+            return None
+        return self._display.create_resource_object("window", prop.value[0])
+
+    def _read_title(self, window):
+        """读取窗口标题，优先使用UTF-8的_NET_WM_NAME"""
+        if window is None:
+            return UNKNOWN_WINDOW_TITLE
+        prop = window.get_full_property(self._NET_WM_NAME, self._UTF8_STRING)
+        if prop and prop.value:
+            value = prop.value
+            return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+        name = window.get_wm_name()
+        return name or UNKNOWN_WINDOW_TITLE
+
+    def _watch_active_window(self, publish=True):
+        """切换监听到新的活动窗口"""
+        from Xlib import error as xerror
+
+        window = self._active_window()
+        if self._active is not None and (window is None or window.id != self._active.id):
+            try:
+                self._active.change_attributes(event_mask=self._X.NoEventMask)
+            except xerror.XError:
+                pass  # 旧窗口可能已经被销毁
+        self._active = window
+
+        try:
+            if window is not None:
+                window.change_attributes(event_mask=self._X.PropertyChangeMask)
+            title = self._read_title(window)
+        except xerror.XError:
+            self._active = None
+            title = UNKNOWN_WINDOW_TITLE
+
+        if publish:
+            self._publish(title)
+        else:
+            self._title = title
+
+    def _process_events(self):
+        """处理X服务器推送的事件"""
+        from Xlib import error as xerror
+
+        self.wakeups.tick()
+        try:
+            while self._display is not None and self._display.pending_events():
+                event = self._display.next_event()
+                if event.type != self._X.PropertyNotify:
+                    continue
+                if event.atom == self._NET_ACTIVE_WINDOW:
+                    self._watch_active_window()
+                elif (event.atom in (self._NET_WM_NAME, self._WM_NAME)
+                      and self._active is not None and event.window.id == self._active.id):
+                    self._publish(self._read_title(self._active))
+        except xerror.XError as e:
+            logging.error(f"处理X11事件错误: {e}")
+
+
+class FakeBackend(ActiveWindowBackend):
+    """可编排的假后端，用于测试和基准"""
+    event_driven = True
+    name = "fake"
+
+    def __init__(self, initial_title=UNKNOWN_WINDOW_TITLE, parent=None):
+        super().__init__(parent)
+        self._title = initial_title
+        self._pending = []
+
+    def set_title(self, title):
+        """模拟前台窗口切换到指定标题"""
+        self._publish(title)
+
+    def play(self, script):
+        """按脚本回放标题变化，script为[(延迟毫秒, 标题), ...]"""
+        for delay, title in script:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda title=title: self.set_title(title))
+            timer.start(delay)
+            self._pending.append(timer)
+
+    def stop(self):
+        for timer in self._pending:
+            timer.stop()
+        self._pending = []
+
+
+def create_backend(parent=None, poll_interval=DEFAULT_POLL_INTERVAL):
+    """创建并启动当前平台最合适的后端，事件源不可用时退回轮询"""
+    candidates = []
+    if sys.platform == "win32":
+        candidates.append(Win32Backend)
+    elif os.environ.get("DISPLAY"):
+        candidates.append(X11Backend)
+
+    for backend_class in candidates:
+        backend = backend_class(parent)
+        if backend.start():
+            logging.info(f"窗口跟踪后端: {backend.name}")
+            return backend
+        backend.deleteLater()
+
+    backend = PollingBackend(read_active_window_title, poll_interval, parent)
+    backend.start()
+    logging.info(f"窗口跟踪后端: {backend.name}（{poll_interval}ms轮询）")
+    return backend